@@ -1,6 +1,7 @@
 # altcoins_info.py
 from __future__ import annotations
 
+from html import escape
 from typing import Dict, List, Tuple, Optional
 
 # Each entry:
@@ -99,6 +100,24 @@ _CURATED: Dict[str, Dict] = {
 }
 
 
+def _render_html(symbol: str, meta: Dict) -> str:
+    lines = [f"ℹ️ <b>{escape(meta.get('name', symbol))}</b>\n{escape(meta.get('note', ''))}".strip()]
+    for title, url in meta.get("links", []):
+        lines.append(f"• <a href=\"{escape(url)}\">{escape(title)}</a>")
+    return "\n".join(lines)
+
+
+# Curated entries are static, so their escaped Telegram HTML is rendered once.
+_CURATED_HTML: Dict[str, str] = {sym: _render_html(sym, meta) for sym, meta in _CURATED.items()}
+
+
+def get_off_binance_html(symbol: str) -> Optional[str]:
+    """Pre-rendered HTML card (name, note, links) for a curated symbol."""
+    if not symbol:
+        return None
+    return _CURATED_HTML.get(symbol.upper())
+
+
 def get_off_binance_info(symbol: str) -> Optional[Dict]:
     if not symbol:
         return None
@@ -1,43 +1,63 @@
 # commands_admin.py
 from __future__ import annotations
 import os
-import time
+import asyncio
+import itertools
 from typing import Set, Iterable
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 import requests
 from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram.ext import Application, CommandHandler, ContextTypes, filters
 from telegram.constants import ParseMode
 from sqlalchemy import text
 
 from db import session_scope
+from plans import invalidate_plan
 
 # Helpers
 def _admin_ids_from_env() -> Set[str]:
     return {s.strip() for s in (os.getenv("ADMIN_TELEGRAM_IDS") or "").split(",") if s.strip()}
 
-async def _admin_only(update: Update, admin_ids: Set[str]) -> bool:
-    uid = str(update.effective_user.id)
-    if uid not in admin_ids:
-        await (update.message or update.effective_message).reply_text("Admin only.")
-        return False
-    return True
+_TG_MAX_TEXT = 4000  # Telegram caps a message at 4096 chars
+
+async def _reply_lines(update: Update, lines: Iterable[str], **kwargs) -> None:
+    """Send lines joined by newlines, split into as many messages as needed
+    so a long listing is never rejected or truncated by Telegram."""
+    msg = update.message or update.effective_message
+    buf: list[str] = []
+    size = 0
+    for line in lines:
+        if buf and size + len(line) + 1 > _TG_MAX_TEXT:
+            await msg.reply_text("\n".join(buf), **kwargs)
+            buf, size = [], 0
+        buf.append(line[:_TG_MAX_TEXT])
+        size += len(buf[-1]) + 1
+    if buf:
+        await msg.reply_text("\n".join(buf), **kwargs)
 
 # ============== Core admin utilities ==============
 
-async def adminstats(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+# One scan of users for both counters, one round trip in total.
+_ADMIN_STATS_SQL = text("""
+    SELECT COUNT(*) AS users,
+           COUNT(*) FILTER (WHERE is_premium) AS premium,
+           (SELECT COUNT(*) FROM alerts) AS alerts
+    FROM users
+""")
+
+def _admin_stats() -> tuple[int, int, int]:
     with session_scope() as s:
-        users = s.execute(text("SELECT COUNT(*) FROM users")).scalar() or 0
-        premium = s.execute(text("SELECT COUNT(*) FROM users WHERE is_premium=TRUE")).scalar() or 0
-        alerts = s.execute(text("SELECT COUNT(*) FROM alerts")).scalar() or 0
+        row = s.execute(_ADMIN_STATS_SQL).first()
+    return row.users or 0, row.premium or 0, row.alerts or 0
+
+async def adminstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    users, premium, alerts = await asyncio.to_thread(_admin_stats)
     await (update.message or update.effective_message).reply_text(
         f"👥 Users: {users}\n💎 Premium: {premium}\n🔔 Alerts: {alerts}"
     )
 
-async def adminalerts(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def adminalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with session_scope() as s:
         total = s.execute(text("SELECT COUNT(*) FROM alerts")).scalar() or 0
         top = s.execute(text("""
@@ -47,23 +67,25 @@ async def adminalerts(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_
         """)).mappings().all()
     lines = [f"🔔 Total alerts: {total}", "🏆 Top users:"]
     lines += [f"• {r['telegram_id']}: {r['c']}" for r in top] or ["(none)"]
-    await (update.message or update.effective_message).reply_text("\n".join(lines))
+    await _reply_lines(update, lines)
 
-async def adminusers(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def adminusers(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with session_scope() as s:
         rows = s.execute(text("""
             SELECT telegram_id, is_premium,
                    (SELECT COUNT(*) FROM alerts a WHERE a.user_id=u.id) AS alerts
             FROM users u ORDER BY u.id DESC LIMIT 50
         """)).mappings().all()
-    lines = ["<b>Recent users</b>"]
-    for r in rows:
-        lines.append(f"{r['telegram_id']} — premium:{bool(r['is_premium'])} — alerts:{r['alerts']}")
-    await (update.message or update.effective_message).reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+    await _reply_lines(
+        update,
+        itertools.chain(
+            ("<b>Recent users</b>",),
+            (f"{r['telegram_id']} — premium:{bool(r['is_premium'])} — alerts:{r['alerts']}" for r in rows),
+        ),
+        parse_mode=ParseMode.HTML,
+    )
 
-async def adminwho(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def adminwho(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args or []
     if not args:
         await (update.message or update.effective_message).reply_text("Usage: /adminwho <telegram_id>")
@@ -84,8 +106,7 @@ async def adminwho(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids
         f"User {tgid}\nPremium:{premium}\nAlerts:{alerts}\nTrial expires:{trial_exp}"
     )
 
-async def adminplans(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def adminplans(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with session_scope() as s:
         total = s.execute(text("SELECT COUNT(*) FROM users")).scalar() or 0
         premium = s.execute(text("SELECT COUNT(*) FROM users WHERE is_premium=TRUE")).scalar() or 0
@@ -97,46 +118,59 @@ async def adminplans(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_i
         f"Plans\nTotal users:{total}\nPremium:{premium}\nActive trials:{active_trials}"
     )
 
-async def adminbroadcast(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
-    msg = " ".join(context.args or [])
-    if not msg:
-        await (update.message or update.effective_message).reply_text("Usage: /adminbroadcast <message>")
-        return
-    sent = 0
+def _all_telegram_ids() -> list[str]:
     with session_scope() as s:
-        ids = [r[0] for r in s.execute(text("SELECT telegram_id FROM users")).all()]
+        return [r[0] for r in s.execute(text("SELECT telegram_id FROM users")).all()]
+
+async def _run_broadcast(bot, reply_to, msg: str) -> None:
+    """Deliver a broadcast off the command's reply path and report when done."""
+    ids = await asyncio.to_thread(_all_telegram_ids)
+    sent = 0
     for tgid in ids:
         try:
-            await context.bot.send_message(chat_id=int(tgid), text=msg)
+            await bot.send_message(chat_id=int(tgid), text=msg)
             sent += 1
-            time.sleep(0.04)  # throttle
         except Exception:
             pass
-    await (update.message or update.effective_message).reply_text(f"Broadcast sent to {sent}/{len(ids)} users.")
+        await asyncio.sleep(0.04)  # throttle without blocking the loop
+    await reply_to.reply_text(f"Broadcast sent to {sent}/{len(ids)} users.")
 
-async def adminexec(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def adminbroadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = " ".join(context.args or [])
+    reply_to = update.message or update.effective_message
+    if not msg:
+        await reply_to.reply_text("Usage: /adminbroadcast <message>")
+        return
+    await reply_to.reply_text("⏳ Broadcast started…")
+    # Tracked by the application, so it is awaited on shutdown and errors are logged.
+    context.application.create_task(_run_broadcast(context.bot, reply_to, msg), update=update)
+
+def _select_rows(sql: str):
+    with session_scope() as s:
+        return s.execute(text(sql)).mappings().all()
+
+async def adminexec(update: Update, context: ContextTypes.DEFAULT_TYPE):
     sql = " ".join(context.args or [])
     if not sql or not sql.strip().lower().startswith("select"):
         await (update.message or update.effective_message).reply_text("Read-only. Usage: /adminexec <SELECT …>")
         return
     try:
-        with session_scope() as s:
-            rows = s.execute(text(sql)).mappings().all()
+        rows = await asyncio.to_thread(_select_rows, sql)
         if not rows:
             await (update.message or update.effective_message).reply_text("(no rows)")
             return
-        keys = rows[0].keys()
-        lines = [" | ".join(keys)]
-        for r in rows[:50]:
-            lines.append(" | ".join(str(r[k]) for k in keys))
-        await (update.message or update.effective_message).reply_text("\n".join(lines))
+        keys = list(rows[0].keys())
+        await _reply_lines(
+            update,
+            itertools.chain(
+                (" | ".join(keys),),
+                (" | ".join(str(r[k]) for k in keys) for r in itertools.islice(rows, 50)),
+            ),
+        )
     except Exception as e:
         await (update.message or update.effective_message).reply_text(f"Error: {e}")
 
-async def adminhealth(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def adminhealth(update: Update, context: ContextTypes.DEFAULT_TYPE):
     base = os.getenv("WEB_URL") or ""
     try:
         b = requests.get(f"{base}/botok", timeout=5).json()
@@ -147,14 +181,48 @@ async def adminhealth(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_
     except Exception as e:
         await (update.message or update.effective_message).reply_text(f"Error: {e}")
 
-async def admintoken(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def admintoken(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tok = os.getenv("BOT_TOKEN") or ""
     masked = tok[:6] + "…" + tok[-4:] if len(tok) > 10 else "set"
     await (update.message or update.effective_message).reply_text(f"BOT_TOKEN: {masked}")
 
 # ====== Trial helpers (grant/info/list) ======
 
+# Resolve the user and compute the extended trial expiry in one round trip.
+# Postgres does the clock math (naive UTC, like the stored ISO strings): extend
+# from the current expiry if still in the future, else from now.
+# User id and latest trial expiry in one round trip. provider_sub_id is free
+# text, so it is parsed in Python: a malformed value falls back to "now"
+# instead of failing the whole grant with a cast error.
+_LATEST_TRIAL_SQL = text("""
+SELECT u.id AS uid, t.provider_sub_id AS expiry
+FROM users u
+LEFT JOIN LATERAL (
+    SELECT s.provider_sub_id
+    FROM subscriptions s
+    WHERE s.user_id = u.id AND s.provider = 'trial'
+    ORDER BY s.created_at DESC
+    LIMIT 1
+) t ON TRUE
+WHERE u.telegram_id = :tg
+""")
+
+def next_trial_expiry(session, telegram_id: str, days: int) -> tuple[int, datetime] | None:
+    """(user id, new naive-UTC expiry) for adding `days` on top of the later of
+    now and the current trial expiry; None if the user doesn't exist."""
+    row = session.execute(_LATEST_TRIAL_SQL, {"tg": telegram_id}).mappings().first()
+    if not row:
+        return None
+    base = datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        ex = datetime.fromisoformat(row["expiry"])
+        if ex.tzinfo is not None:
+            ex = ex.astimezone(timezone.utc).replace(tzinfo=None)
+        base = max(base, ex)
+    except (TypeError, ValueError):
+        pass
+    return int(row["uid"]), base + timedelta(days=days)
+
 def _subscriptions_columns(session) -> set[str]:
     cols = session.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='subscriptions'")).scalars().all()
     return {c.lower() for c in cols}
@@ -183,41 +251,23 @@ def _insert_trial_row(session, user_id: int, expiry_iso: str) -> None:
             "VALUES (:uid, 'trial', :expiry, NOW(), NOW())"
         ), p)
 
-async def grantdays(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def grantdays(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args or []
-    if len(args) < 2:
+    # isdecimal also rejects signs, so a negative day count can't shorten a trial.
+    if len(args) != 2 or not args[1].isdecimal():
         await (update.message or update.effective_message).reply_text("Usage: /grantdays <telegram_id> <days>")
         return
-    target_tg = args[0]
-    try:
-        days = int(args[1])
-    except Exception:
-        await (update.message or update.effective_message).reply_text("Days must be integer.")
-        return
+    target_tg, days = args[0], int(args[1])
     with session_scope() as s:
-        u = s.execute(text("SELECT id FROM users WHERE telegram_id=:tg"), {"tg": target_tg}).mappings().first()
-        if not u:
+        nxt = next_trial_expiry(s, target_tg, days)
+        if not nxt:
             await (update.message or update.effective_message).reply_text("User not found."); return
-        uid = int(u["id"])
-        now = datetime.utcnow()
-        t = s.execute(text(
-            "SELECT provider_sub_id FROM subscriptions WHERE user_id=:uid AND provider='trial' ORDER BY created_at DESC LIMIT 1"
-        ), {"uid": uid}).mappings().first()
-        base = now
-        if t and t.get("provider_sub_id"):
-            try:
-                ex = datetime.fromisoformat(t.get("provider_sub_id"))
-                ex = ex.replace(tzinfo=None)
-                if ex > now: base = ex
-            except Exception:
-                pass
-        new_expiry = base + timedelta(days=days)
+        uid, new_expiry = nxt
         _insert_trial_row(s, user_id=uid, expiry_iso=new_expiry.isoformat())
+    invalidate_plan(target_tg)
     await (update.message or update.effective_message).reply_text(f"Granted {days}d to {target_tg}. New expiry: {new_expiry.isoformat()}")
 
-async def trialinfo(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def trialinfo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args or []
     if not args:
         await (update.message or update.effective_message).reply_text("Usage: /trialinfo <telegram_id>")
@@ -234,33 +284,37 @@ async def trialinfo(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_id
             f"User {target_tg} — expires: {row['provider_sub_id']} — created: {row['created_at']}"
         )
 
-async def listtrials(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_ids: Set[str]):
-    if not await _admin_only(update, admin_ids): return
+async def listtrials(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with session_scope() as s:
         rows = s.execute(text(
             "SELECT u.telegram_id, s.provider_sub_id, s.created_at FROM subscriptions s JOIN users u ON u.id=s.user_id WHERE s.provider='trial' ORDER BY s.created_at DESC LIMIT 50"
         )).mappings().all()
-    lines = ["<b>Recent trials</b>"]
-    for r in rows:
-        lines.append(f"{r['telegram_id']} — expires: {r['provider_sub_id']} — created: {r['created_at']}")
-    await (update.message or update.effective_message).reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+    await _reply_lines(
+        update,
+        itertools.chain(
+            ("<b>Recent trials</b>",),
+            (f"{r['telegram_id']} — expires: {r['provider_sub_id']} — created: {r['created_at']}" for r in rows),
+        ),
+        parse_mode=ParseMode.HTML,
+    )
 
 # ============== Registration ==============
 
 def register_admin_handlers(app: Application, admin_ids: Set[str]):
-    # pumplive is handled in commands_extra; keep placeholder to avoid missing command complaints if needed
-    app.add_handler(CommandHandler("pumplive", lambda u, c: c.application.create_task(c.bot.send_message(u.effective_chat.id, "Use /pumplive via extra handlers if implemented."))))
-    app.add_handler(CommandHandler("adminstats", lambda u, c: adminstats(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminalerts", lambda u, c: adminalerts(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminusers", lambda u, c: adminusers(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminwho", lambda u, c: adminwho(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminplans", lambda u, c: adminplans(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminbroadcast", lambda u, c: adminbroadcast(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminexec", lambda u, c: adminexec(u, c, admin_ids)))
-    app.add_handler(CommandHandler("adminhealth", lambda u, c: adminhealth(u, c, admin_ids)))
-    app.add_handler(CommandHandler("admintoken", lambda u, c: admintoken(u, c, admin_ids)))
+    # Non-admin updates are dropped by the filter before a handler coroutine
+    # is even created, so the handlers below do no admin check of their own.
+    admin_only = filters.User(user_id=[int(a) for a in admin_ids if a.isdigit()])
+    app.add_handler(CommandHandler("adminstats", adminstats, filters=admin_only))
+    app.add_handler(CommandHandler("adminalerts", adminalerts, filters=admin_only))
+    app.add_handler(CommandHandler("adminusers", adminusers, filters=admin_only))
+    app.add_handler(CommandHandler("adminwho", adminwho, filters=admin_only))
+    app.add_handler(CommandHandler("adminplans", adminplans, filters=admin_only))
+    app.add_handler(CommandHandler("adminbroadcast", adminbroadcast, filters=admin_only))
+    app.add_handler(CommandHandler("adminexec", adminexec, filters=admin_only))
+    app.add_handler(CommandHandler("adminhealth", adminhealth, filters=admin_only))
+    app.add_handler(CommandHandler("admintoken", admintoken, filters=admin_only))
 
     # Trial management
-    app.add_handler(CommandHandler("grantdays", lambda u, c: grantdays(u, c, admin_ids)))
-    app.add_handler(CommandHandler("trialinfo", lambda u, c: trialinfo(u, c, admin_ids)))
-    app.add_handler(CommandHandler("listtrials", lambda u, c: listtrials(u, c, admin_ids)))
+    app.add_handler(CommandHandler("grantdays", grantdays, filters=admin_only))
+    app.add_handler(CommandHandler("trialinfo", trialinfo, filters=admin_only))
+    app.add_handler(CommandHandler("listtrials", listtrials, filters=admin_only))
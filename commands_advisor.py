@@ -23,7 +23,7 @@ except Exception:
 BUDGET_RE = re.compile(r"^[0-9]+(\.[0-9]+)?$")
 
 
-@dataclass
+@dataclass(slots=True)
 class AdvisorProfile:
     user_id: int
     risk: str  # low | medium | high
@@ -147,9 +147,10 @@ async def cmd_dca(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Pump alerts opt-in using user_settings table via models_extras helpers
 async def cmd_pumplive(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = update.message or update.effective_message
+    uid = str(update.effective_user.id)
     if not context.args:
-        cur = get_user_setting(str(update.effective_user.id), "pump_optin") or "off"
-        thr = get_user_setting(str(update.effective_user.id), "pump_threshold") or os.getenv("PUMP_THRESHOLD_PERCENT", "10")
+        cur = get_user_setting(uid, "pump_optin") or "off"
+        thr = get_user_setting(uid, "pump_threshold") or os.getenv("PUMP_THRESHOLD_PERCENT", "10")
         await chat.reply_text(f"Usage: /pumplive on|off [threshold%]\nCurrent: {cur}  threshold={thr}%")
         return
 
@@ -161,7 +162,6 @@ async def cmd_pumplive(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             threshold = None
 
-    uid = str(update.effective_user.id)
     if action == "on":
         set_user_setting(uid, "pump_optin", "on")
         if threshold is not None:
@@ -4,13 +4,13 @@ from __future__ import annotations
 import math
 from typing import Dict, List, Tuple
 
-import requests
 from sqlalchemy import text
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import Application, CommandHandler, ContextTypes
 
 from db import session_scope
+from http_client import SESSION
 from worker_logic import fetch_price_binance
 
 BINANCE_TICKER_24H = "https://api.binance.com/api/v3/ticker/24hr"
@@ -19,7 +19,7 @@ BINANCE_TICKER_24H = "https://api.binance.com/api/v3/ticker/24hr"
 def _ticker_24h(symbol_pair: str) -> dict | None:
     """Fetch 24h ticker from Binance for lightweight insights."""
     try:
-        r = requests.get(BINANCE_TICKER_24H, params={"symbol": symbol_pair}, timeout=12)
+        r = SESSION.get(BINANCE_TICKER_24H, params={"symbol": symbol_pair}, timeout=12)
         if r.status_code == 200:
             return r.json()
     except Exception:
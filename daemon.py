@@ -1,13 +1,20 @@
 # daemon.py
-import os, time, threading, re
+import os, time, threading, re, asyncio
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache, wraps
 import requests
+try:
+    import uvloop  # libuv event loop; not available on Windows
+except ImportError:
+    uvloop = None
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
 from telegram.error import Conflict
 from telegram.constants import ParseMode
 from sqlalchemy import select, text
 from db import init_db, session_scope, User, Alert, Subscription, engine
+from http_client import async_client, aclose_async_client
 from worker_logic import run_alert_cycle, resolve_symbol, fetch_price_binance
 
 # ───────── ENV ─────────
@@ -31,9 +38,23 @@ _ADMIN_IDS = {s.strip() for s in (os.getenv("ADMIN_TELEGRAM_IDS") or "").split("
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN missing")
 
+_TG_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
+_URL_SEND_MESSAGE = f"{_TG_API}/sendMessage"
+_URL_DELETE_WEBHOOK = f"{_TG_API}/deleteWebhook"
+
 def is_admin(tg_id: str | None) -> bool:
     return (tg_id or "") in _ADMIN_IDS
 
+def admin_only(handler):
+    """Gate a command handler: non-admins get "Admins only." and it never runs."""
+    admins = _ADMIN_IDS  # bound once; a local lookup per call
+    @wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if str(update.effective_user.id) not in admins:
+            await target_msg(update).reply_text("Admins only."); return
+        return await handler(update, context)
+    return wrapper
+
 # ───────── Advisory Locks (Postgres) ─────────
 BOT_LOCK_ID = 911001
 ALERTS_LOCK_ID = 911002
@@ -58,45 +79,78 @@ def paypal_upgrade_url_for(tg_id: str | None) -> str | None:
         return f"{WEB_URL}/billing/paypal/start?tg={tg_id}&plan_id={PAYPAL_PLAN_ID}"
     return PAYPAL_SUBSCRIBE_URL  # fallback (plain plan link, no custom_id mapping)
 
-def send_admins(text_msg: str) -> None:
-    if not _ADMIN_IDS:
-        return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    for admin_id in _ADMIN_IDS:
-        if not admin_id:
-            continue
-        try:
-            requests.post(url, json={"chat_id": admin_id, "text": text_msg}, timeout=10)
-        except Exception:
-            pass
+async def notify_admins(bot, text_msg: str) -> None:
+    """Send to every admin concurrently through the bot's own client; a
+    failed delivery to one admin does not affect the others."""
+    if _ADMIN_IDS:
+        await asyncio.gather(
+            *(bot.send_message(chat_id=admin_id, text=text_msg) for admin_id in _ADMIN_IDS),
+            return_exceptions=True,
+        )
 
-def send_message(chat_id: str, text_msg: str) -> tuple[int, str]:
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    r = requests.post(url, json={"chat_id": chat_id, "text": text_msg}, timeout=15)
+async def send_message(chat_id: str, text_msg: str) -> tuple[int, str]:
+    """Raw sendMessage on the shared keep-alive AsyncClient, so handlers that
+    need the HTTP status never block the bot loop on a Telegram round trip."""
+    r = await async_client().post(_URL_SEND_MESSAGE, json={"chat_id": chat_id, "text": text_msg})
     return r.status_code, r.text
 
 def op_from_rule(rule: str) -> str:
     return ">" if rule == "price_above" else "<"
 
+# ───────── User lookup cache ─────────
+# Most handlers only need (users.id, is_premium) for the caller, often twice
+# per update. Keep it for a short TTL; premium changes made by other processes
+# (billing webhook) show up within _USER_CACHE_TTL. Only touched from the bot
+# loop, and misses are not cached so a user created by /start is seen at once.
+_USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+_USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX_ENTRIES", "100000"))
+_USER_CACHE: "OrderedDict[str, tuple[int, bool, float]]" = OrderedDict()
+
+def _remember_user(tg_id: str, user_id: int, is_premium: bool) -> None:
+    """Call only after the session that wrote the row has committed."""
+    _USER_CACHE[tg_id] = (user_id, is_premium, time.monotonic())
+    _USER_CACHE.move_to_end(tg_id)
+    while len(_USER_CACHE) > _USER_CACHE_MAX:
+        _USER_CACHE.popitem(last=False)
+
+def cached_user(tg_id: str) -> tuple[int, bool] | None:
+    """(users.id, is_premium) for tg_id, or None if the user doesn't exist."""
+    hit = _USER_CACHE.get(tg_id)
+    if hit and time.monotonic() - hit[2] < _USER_CACHE_TTL:
+        _USER_CACHE.move_to_end(tg_id)
+        return hit[0], hit[1]
+    with session_scope() as session:
+        row = session.execute(
+            text("SELECT id, is_premium FROM users WHERE telegram_id = :tg"), {"tg": tg_id}
+        ).first()
+    if not row:
+        _USER_CACHE.pop(tg_id, None)
+        return None
+    _remember_user(tg_id, int(row.id), bool(row.is_premium))
+    return int(row.id), bool(row.is_premium)
+
 # ───────── UI ─────────
+# The menu rows are the same for everyone; only the PayPal row is per user.
+_MAIN_MENU_ROWS = (
+    (
+        InlineKeyboardButton("📊 Price BTC", callback_data="go:price:BTC"),
+        InlineKeyboardButton("🔔 My Alerts", callback_data="go:myalerts"),
+    ),
+    (
+        InlineKeyboardButton("⏱️ Set Alert Help", callback_data="go:setalerthelp"),
+        InlineKeyboardButton("ℹ️ Help", callback_data="go:help"),
+    ),
+    (
+        InlineKeyboardButton("🆘 Support", callback_data="go:support"),
+    ),
+)
+_MAIN_MENU_STATIC = InlineKeyboardMarkup(_MAIN_MENU_ROWS)
+
 def main_menu_keyboard(tg_id: str | None) -> InlineKeyboardMarkup:
-    rows = [
-        [
-            InlineKeyboardButton("📊 Price BTC", callback_data="go:price:BTC"),
-            InlineKeyboardButton("🔔 My Alerts", callback_data="go:myalerts"),
-        ],
-        [
-            InlineKeyboardButton("⏱️ Set Alert Help", callback_data="go:setalerthelp"),
-            InlineKeyboardButton("ℹ️ Help", callback_data="go:help"),
-        ],
-        [
-            InlineKeyboardButton("🆘 Support", callback_data="go:support"),
-        ]
-    ]
     u = paypal_upgrade_url_for(tg_id)
-    if u:
-        rows.append([InlineKeyboardButton("💎 Upgrade with PayPal", url=u)])
-    return InlineKeyboardMarkup(rows)
+    if not u:
+        return _MAIN_MENU_STATIC
+    return InlineKeyboardMarkup((*_MAIN_MENU_ROWS, (InlineKeyboardButton("💎 Upgrade with PayPal", url=u),)))
 
 def upgrade_keyboard(tg_id: str | None):
     u = paypal_upgrade_url_for(tg_id)
@@ -104,6 +158,9 @@ def upgrade_keyboard(tg_id: str | None):
         return InlineKeyboardMarkup([[InlineKeyboardButton("💎 Upgrade with PayPal", url=u)]])
     return None
 
+# Only two limits ever occur (admin 9999 and FREE_ALERT_LIMIT), so each
+# rendering is built once.
+@lru_cache(maxsize=8)
 def start_text(limit: int) -> str:
     return (
         "<b>Crypto Alerts Bot</b>\n"
@@ -152,6 +209,9 @@ ADMIN_HELP = (
     "• /reply <tg_id> <message> — reply to a user’s /support\n"
 )
 
+_HELP_CHUNKS = tuple(safe_chunks(HELP_TEXT_HTML))
+_ADMIN_HELP_CHUNKS = tuple(safe_chunks(ADMIN_HELP))
+
 # ───────── Commands ─────────
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
@@ -162,6 +222,8 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if is_admin(tg_id) and not user.is_premium:
             user.is_premium = True  # admins always premium
         session.add(user); session.flush()
+        cached = (user.id, bool(user.is_premium))
+    _remember_user(tg_id, *cached)  # only once the row is committed
     lim = 9999 if is_admin(tg_id) else FREE_ALERT_LIMIT
     await target_msg(update).reply_text(
         start_text(lim),
@@ -172,7 +234,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
-    for chunk in safe_chunks(HELP_TEXT_HTML):
+    for chunk in _HELP_CHUNKS:
         await target_msg(update).reply_text(
             chunk,
             reply_markup=upgrade_keyboard(tg_id),
@@ -180,11 +242,9 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
             disable_web_page_preview=True
         )
 
+@admin_only
 async def cmd_adminhelp(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tg_id = str(update.effective_user.id)
-    if not is_admin(tg_id):
-        await target_msg(update).reply_text("Admins only."); return
-    for chunk in safe_chunks(ADMIN_HELP):
+    for chunk in _ADMIN_HELP_CHUNKS:
         await target_msg(update).reply_text(chunk)
 
 async def cmd_whoami(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -198,6 +258,8 @@ async def cmd_whoami(update: Update, context: ContextTypes.DEFAULT_TYPE):
             user.is_premium = True
         session.add(user); session.flush()
         prem = bool(user.is_premium)
+        user_id = user.id
+    _remember_user(tg_id, user_id, prem)  # only once the row is committed
     await target_msg(update).reply_text(f"You are: {role}\nPremium: {prem}")
 
 async def cmd_price(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -237,6 +299,7 @@ async def cmd_setalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if is_admin(tg_id):
             user.is_premium = True  # admin bypass
         session.add(user); session.flush()
+        cached = (user.id, bool(user.is_premium))
 
         user_total_before = session.execute(
             text("SELECT COUNT(*) FROM alerts WHERE user_id=:uid"),
@@ -248,15 +311,20 @@ async def cmd_setalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 text("SELECT COUNT(*) FROM alerts WHERE user_id=:uid AND enabled = TRUE"),
                 {"uid": user.id}
             ).scalar_one()
-            if active_alerts >= FREE_ALERT_LIMIT:
-                await target_msg(update).reply_text(f"Free plan limit reached ({FREE_ALERT_LIMIT}). Upgrade for unlimited.")
-                return
+            limit_hit = active_alerts >= FREE_ALERT_LIMIT
+        else:
+            limit_hit = False
 
-        alert = Alert(user_id=user.id, symbol=pair, rule=rule, value=val, cooldown_seconds=900)
-        session.add(alert); session.flush()
-        aid = alert.id
-        user_local_no = user_total_before + 1  # #U…
+        if not limit_hit:
+            alert = Alert(user_id=user.id, symbol=pair, rule=rule, value=val, cooldown_seconds=900)
+            session.add(alert); session.flush()
+            aid = alert.id
+            user_local_no = user_total_before + 1  # #U…
 
+    _remember_user(tg_id, *cached)  # only once the row is committed
+    if limit_hit:
+        await target_msg(update).reply_text(f"Free plan limit reached ({FREE_ALERT_LIMIT}). Upgrade for unlimited.")
+        return
     await target_msg(update).reply_text(f"✅ Alert #U{user_local_no} (ID {aid}) set: {pair} {op} {val}")
 
 def _alert_buttons(aid: int) -> InlineKeyboardMarkup:
@@ -266,13 +334,13 @@ def _alert_buttons(aid: int) -> InlineKeyboardMarkup:
 
 async def cmd_myalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
+    user = cached_user(tg_id)
+    if not user:
+        await target_msg(update).reply_text("No alerts yet."); return
     with session_scope() as session:
-        user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-        if not user:
-            await target_msg(update).reply_text("No alerts yet."); return
         rows = session.execute(text(
             "SELECT id, symbol, rule, value, enabled FROM alerts WHERE user_id=:uid ORDER BY id ASC"
-        ), {"uid": user.id}).all()
+        ), {"uid": user[0]}).all()
     if not rows:
         await target_msg(update).reply_text("No alerts in DB."); return
     for idx, r in enumerate(rows, start=1):
@@ -282,44 +350,39 @@ async def cmd_myalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_delalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
-    with session_scope() as session:
-        user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-        is_premium = bool(user and user.is_premium) or is_admin(tg_id)
+    user = cached_user(tg_id)
+    is_premium = bool(user and user[1]) or is_admin(tg_id)
     if not is_premium:
         await target_msg(update).reply_text("This feature is for Premium users. Upgrade to delete alerts.")
         return
     if not context.args:
         await target_msg(update).reply_text("Usage: /delalert <id>")
         return
-    try:
-        aid = int(context.args[0])
-    except Exception:
+    if not context.args[0].isdecimal():
         await target_msg(update).reply_text("Bad id"); return
+    aid = int(context.args[0])
 
+    if not user:
+        await target_msg(update).reply_text("User not found."); return
     with session_scope() as session:
-        user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-        if not user:
-            await target_msg(update).reply_text("User not found."); return
         if is_admin(tg_id):
             res = session.execute(text("DELETE FROM alerts WHERE id=:id"), {"id": aid})
         else:
-            res = session.execute(text("DELETE FROM alerts WHERE id=:id AND user_id=:uid"), {"id": aid, "uid": user.id})
+            res = session.execute(text("DELETE FROM alerts WHERE id=:id AND user_id=:uid"), {"id": aid, "uid": user[0]})
         deleted = res.rowcount or 0
     await target_msg(update).reply_text("Alert (ID {0}) deleted.".format(aid) if deleted else "Nothing deleted. Check the id (or ownership).")
 
 async def cmd_clearalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
-    with session_scope() as session:
-        user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-        is_premium = bool(user and user.is_premium) or is_admin(tg_id)
+    user = cached_user(tg_id)
+    is_premium = bool(user and user[1]) or is_admin(tg_id)
     if not is_premium:
         await target_msg(update).reply_text("This feature is for Premium users. Upgrade to clear alerts.")
         return
+    if not user:
+        await target_msg(update).reply_text("User not found."); return
     with session_scope() as session:
-        user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-        if not user:
-            await target_msg(update).reply_text("User not found."); return
-        res = session.execute(text("DELETE FROM alerts WHERE user_id=:uid"), {"uid": user.id})
+        res = session.execute(text("DELETE FROM alerts WHERE user_id=:uid"), {"uid": user[0]})
         deleted = res.rowcount or 0
     await target_msg(update).reply_text(f"Deleted {deleted} alert(s).")
 
@@ -331,30 +394,32 @@ async def cmd_requestcoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     requester = update.effective_user
     who = f"{requester.first_name or ''} (@{requester.username}) id={requester.id}"
     msg = f"🆕 Coin request: {sym}\nFrom: {who}"
-    await target_msg(update).reply_text(f"Got it! We'll review and add {sym} if possible.")
-    send_admins(msg)
+    await asyncio.gather(
+        target_msg(update).reply_text(f"Got it! We'll review and add {sym} if possible."),
+        notify_admins(context.bot, msg),
+    )
 
 async def cmd_support(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tg_id = str(update.effective_user.id)
+    who = update.effective_user
+    tg_id = str(who.id)
     if not context.args:
         await target_msg(update).reply_text("Send: /support <your message to the admins>")
         return
     msg = " ".join(context.args).strip()
-    who = update.effective_user
     header = f"🆘 Support message\nFrom: {who.first_name or ''} (@{who.username}) id={tg_id}"
     full = f"{header}\n\n{msg}"
-    send_admins(full)
-    await target_msg(update).reply_text("✅ Your message has been sent to the support team. You will get a reply here soon.")
+    await asyncio.gather(
+        notify_admins(context.bot, full),
+        target_msg(update).reply_text("✅ Your message has been sent to the support team. You will get a reply here soon."),
+    )
 
+@admin_only
 async def cmd_reply(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tg_id = str(update.effective_user.id)
-    if not is_admin(tg_id):
-        await target_msg(update).reply_text("Admins only."); return
     if len(context.args) < 2:
         await target_msg(update).reply_text("Usage: /reply <tg_id> <message>"); return
     target_id = context.args[0]
     text_msg = " ".join(context.args[1:]).strip()
-    code, body = send_message(target_id, f"💬 Support reply:\n{text_msg}")
+    code, body = await send_message(target_id, f"💬 Support reply:\n{text_msg}")
     await target_msg(update).reply_text(f"Reply sent → {target_id}\nstatus={code}\n{body[:160]}")
 
 async def cmd_cancel_autorenew(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -376,42 +441,37 @@ async def cmd_cancel_autorenew(update: Update, context: ContextTypes.DEFAULT_TYP
     except Exception as e:
         await target_msg(update).reply_text(f"Cancel error: {e}")
 
-def _require_admin(update: Update) -> str | None:
-    tg_id = str(update.effective_user.id)
-    if not is_admin(tg_id):
-        return tg_id
-    return None
-
+@admin_only
 async def cmd_adminstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
 
     users_total = users_premium = alerts_total = alerts_active = 0
     subs_total = subs_active = subs_cancel_at_period_end = subs_cancelled = subs_unknown = 0
     subs_note = ""
 
     with session_scope() as session:
+        # One scan per table; FILTER gives every sub-count from that scan.
         try:
-            users_total = session.execute(text("SELECT COUNT(*) FROM users")).scalar_one()
-            users_premium = session.execute(text("SELECT COUNT(*) FROM users WHERE is_premium = TRUE")).scalar_one()
+            users_total, users_premium = session.execute(text(
+                "SELECT COUNT(*), COUNT(*) FILTER (WHERE is_premium) FROM users"
+            )).one()
         except Exception as e:
             subs_note += f"\n• users: {e}"
         try:
-            alerts_total = session.execute(text("SELECT COUNT(*) FROM alerts")).scalar_one()
-            alerts_active = session.execute(text("SELECT COUNT(*) FROM alerts WHERE enabled = TRUE")).scalar_one()
+            alerts_total, alerts_active = session.execute(text(
+                "SELECT COUNT(*), COUNT(*) FILTER (WHERE enabled) FROM alerts"
+            )).one()
         except Exception as e:
             subs_note += f"\n• alerts: {e}"
         try:
-            subs_total = session.execute(text("SELECT COUNT(*) FROM subscriptions")).scalar_one()
-            subs_active = session.execute(text(
-                "SELECT COUNT(*) FROM subscriptions WHERE status_internal = 'ACTIVE'"
-            )).scalar_one()
-            subs_cancel_at_period_end = session.execute(text(
-                "SELECT COUNT(*) FROM subscriptions WHERE status_internal = 'CANCEL_AT_PERIOD_END'"
-            )).scalar_one()
-            subs_cancelled = session.execute(text(
-                "SELECT COUNT(*) FROM subscriptions WHERE status_internal = 'CANCELLED'"
-            )).scalar_one()
+            subs_total, subs_active, subs_cancel_at_period_end, subs_cancelled = session.execute(text(
+                """
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE status_internal = 'ACTIVE'),
+                       COUNT(*) FILTER (WHERE status_internal = 'CANCEL_AT_PERIOD_END'),
+                       COUNT(*) FILTER (WHERE status_internal = 'CANCELLED')
+                FROM subscriptions
+                """
+            )).one()
             subs_unknown = subs_total - subs_active - subs_cancel_at_period_end - subs_cancelled
         except Exception as e:
             subs_note += f"\n• subscriptions: {e}"
@@ -431,9 +491,8 @@ async def cmd_adminstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for chunk in safe_chunks(msg):
         await target_msg(update).reply_text(chunk)
 
+@admin_only
 async def cmd_adminsubs(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
 
     with session_scope() as session:
         try:
@@ -465,9 +524,8 @@ async def cmd_adminsubs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for chunk in safe_chunks(msg):
         await target_msg(update).reply_text(chunk)
 
+@admin_only
 async def cmd_admincheck(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
     try:
         try:
             url_masked = engine.url.render_as_string(hide_password=True)
@@ -498,9 +556,8 @@ async def cmd_admincheck(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         await target_msg(update).reply_text(f"admincheck error: {e}")
 
+@admin_only
 async def cmd_listalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
     with session_scope() as session:
         rows = session.execute(text("""
             SELECT a.id, a.symbol, a.rule, a.value, a.enabled, a.last_fired_at, a.last_met
@@ -524,21 +581,18 @@ async def cmd_listalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_testalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
     try:
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-        r = requests.post(url, json={"chat_id": tg_id, "text": "Test alert ✅"}, timeout=10)
-        await target_msg(update).reply_text(f"testalert status={r.status_code} body={r.text[:200]}")
+        code, body = await send_message(tg_id, "Test alert ✅")
+        await target_msg(update).reply_text(f"testalert status={code} body={body[:200]}")
     except Exception as e:
         await target_msg(update).reply_text(f"testalert exception: {e}")
 
+@admin_only
 async def cmd_resetalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
     if not context.args:
         await target_msg(update).reply_text("Usage: /resetalert <id>"); return
-    try:
-        aid = int(context.args[0])
-    except Exception:
+    if not context.args[0].isdecimal():
         await target_msg(update).reply_text("Bad id"); return
+    aid = int(context.args[0])
 
     with session_scope() as session:
         row = session.execute(text("SELECT id FROM alerts WHERE id=:id"), {"id": aid}).first()
@@ -547,15 +601,13 @@ async def cmd_resetalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
         session.execute(text("UPDATE alerts SET last_fired_at = NULL, last_met = FALSE WHERE id=:id"), {"id": aid})
     await target_msg(update).reply_text(f"Alert (ID {aid}) reset (last_fired_at=NULL, last_met=FALSE).")
 
+@admin_only
 async def cmd_forcealert(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
     if not context.args:
         await target_msg(update).reply_text("Usage: /forcealert <id>"); return
-    try:
-        aid = int(context.args[0])
-    except Exception:
+    if not context.args[0].isdecimal():
         await target_msg(update).reply_text("Bad id"); return
+    aid = int(context.args[0])
 
     with session_scope() as session:
         r = session.execute(text("""
@@ -570,7 +622,7 @@ async def cmd_forcealert(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await target_msg(update).reply_text("No telegram_id for this user; cannot send."); return
         try:
             textmsg = f"🔔 (force) Alert (ID {r.id}) | {r.symbol} {r.rule} {r.value}"
-            code, body = send_message(chat_id, textmsg)
+            code, body = await send_message(chat_id, textmsg)
             if code == 200:
                 with session_scope() as s2:
                     s2.execute(text("UPDATE alerts SET last_fired_at = NOW(), last_met = TRUE WHERE id=:id"), {"id": aid})
@@ -580,9 +632,8 @@ async def cmd_forcealert(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             await target_msg(update).reply_text(f"Force send exception: {e}")
 
+@admin_only
 async def cmd_runalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if _require_admin(update):
-        await target_msg(update).reply_text("Admins only."); return
     with session_scope() as session:
         counters = run_alert_cycle(session)
         rows = session.execute(text("""
@@ -596,10 +647,9 @@ async def cmd_runalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for chunk in safe_chunks("\n".join(lines)):
         await target_msg(update).reply_text(chunk)
 
+@admin_only
 async def cmd_claim(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
-    if not is_admin(tg_id):
-        await target_msg(update).reply_text("Admins only."); return
     if not context.args:
         await target_msg(update).reply_text("Usage: /claim <subscription_id>"); return
     sub_id = context.args[0]
@@ -626,7 +676,7 @@ async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(query.from_user.id)
 
     if data == "go:help":
-        for chunk in safe_chunks(HELP_TEXT_HTML):
+        for chunk in _HELP_CHUNKS:
             await query.message.reply_text(chunk, parse_mode=ParseMode.HTML,
                                            disable_web_page_preview=True,
                                            reply_markup=upgrade_keyboard(tg_id))
@@ -653,9 +703,8 @@ async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # destructive actions need premium/admin
-    with session_scope() as session:
-        user = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-        is_premium_flag = bool(user and user.is_premium) or is_admin(tg_id)
+    user = cached_user(tg_id)
+    is_premium_flag = bool(user and user[1]) or is_admin(tg_id)
 
     if data.startswith("del:"):
         try:
@@ -672,8 +721,7 @@ async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.edit_message_text("Alert not found.")
                 return
             if not is_admin(tg_id):
-                u = session.execute(select(User).where(User.telegram_id == tg_id)).scalar_one_or_none()
-                if not u or owner.user_id != u.id:
+                if not user or owner.user_id != user[0]:
                     await query.edit_message_text("You can delete only your own alerts.")
                     return
             res = session.execute(text("DELETE FROM alerts WHERE id=:id"), {"id": aid})
@@ -703,12 +751,15 @@ def alerts_loop():
 
 def delete_webhook_if_any():
     try:
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook"
+        url = _URL_DELETE_WEBHOOK
         r = requests.get(url, timeout=10)
         print({"msg": "delete_webhook", "status": r.status_code, "body": r.text[:200]})
     except Exception as e:
         print({"msg": "delete_webhook_error", "error": str(e)})
 
+async def _close_http_client(app: Application) -> None:
+    await aclose_async_client()
+
 # ───────── Main ─────────
 def main():
     t = threading.Thread(target=alerts_loop, daemon=True)
@@ -724,7 +775,7 @@ def main():
     init_db()
     delete_webhook_if_any()
 
-    app = Application.builder().token(BOT_TOKEN).build()
+    app = Application.builder().token(BOT_TOKEN).post_shutdown(_close_http_client).build()
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("help", cmd_help))
     app.add_handler(CommandHandler("adminhelp", cmd_adminhelp))
@@ -753,6 +804,9 @@ def main():
 
     print({"msg": "bot_start"})
 
+    # run_polling creates its loop through the policy, so this makes it uvloop.
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     while True:
         try:
             app.run_polling(allowed_updates=None, drop_pending_updates=False)
@@ -3,12 +3,32 @@ import os
 from contextlib import contextmanager
 from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, text
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.pool import NullPool
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is missing")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+# Handlers hit the DB from asyncio.to_thread workers, so size the pool to the
+# executor rather than SQLAlchemy's default 5+10.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Recycle before managed Postgres / proxies silently drop idle connections.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    future=True,
+)
+# Session advisory locks pin a connection for the process lifetime; keep those
+# off the main pool so request-path work never competes with them. AUTOCOMMIT
+# so the lock query does not leave the session "idle in transaction" for hours
+# (holding back VACUUM and tripping idle_in_transaction_session_timeout).
+lock_engine = create_engine(DATABASE_URL, poolclass=NullPool, isolation_level="AUTOCOMMIT", future=True)
 Base = declarative_base()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
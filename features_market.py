@@ -17,7 +17,7 @@ import re
 from typing import Optional, List, Tuple, Dict
 from datetime import datetime, timezone
 
-import requests
+from http_client import SESSION
 from xml.etree import ElementTree as ET
 
 # ---------- HTTP ----------
@@ -25,7 +25,7 @@ _DEF_TIMEOUT = (10, 20)  # (connect, read)
 
 def _http_get_json(url: str, params: dict | None = None, headers: dict | None = None) -> Optional[dict]:
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=_DEF_TIMEOUT)
+        r = SESSION.get(url, params=params, headers=headers, timeout=_DEF_TIMEOUT)
         if r.status_code != 200:
             return None
         return r.json()
@@ -34,7 +34,7 @@ def _http_get_json(url: str, params: dict | None = None, headers: dict | None =
 
 def _http_get_text(url: str, params: dict | None = None, headers: dict | None = None) -> Optional[str]:
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=_DEF_TIMEOUT)
+        r = SESSION.get(url, params=params, headers=headers, timeout=_DEF_TIMEOUT)
         if r.status_code != 200:
             return None
         return r.text
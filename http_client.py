@@ -0,0 +1,39 @@
+# http_client.py
+# Shared outbound HTTP clients. One keep-alive pool per process instead of a
+# fresh TCP+TLS handshake per Binance/Telegram call.
+#   - SESSION: sync requests.Session for worker threads and sync helpers
+#   - async_client(): httpx.AsyncClient for coroutines on the bot loop
+
+from __future__ import annotations
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+_POOL_MAXSIZE = 20
+
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_POOL_MAXSIZE)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+_ASYNC: httpx.AsyncClient | None = None
+
+
+def async_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient, creating it on first use.
+    Must be called from the event loop that will use it."""
+    global _ASYNC
+    if _ASYNC is None or _ASYNC.is_closed:
+        _ASYNC = httpx.AsyncClient(
+            timeout=httpx.Timeout(15),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=_POOL_MAXSIZE),
+        )
+    return _ASYNC
+
+
+async def aclose_async_client() -> None:
+    global _ASYNC
+    if _ASYNC is not None:
+        await _ASYNC.aclose()
+        _ASYNC = None
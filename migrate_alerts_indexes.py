@@ -0,0 +1,32 @@
+# migrate_alerts_indexes.py
+# Indexes for /myalerts and the enabled-alerts scan.
+# Idempotent: safe to run multiple times.
+
+from sqlalchemy import text
+from db import session_scope
+
+# /myalerts reads "WHERE user_id=:uid ORDER BY id DESC LIMIT 20": the index
+# gives the 20 rows in order and the heap fetch for them is cheap, so it stays
+# narrow rather than covering (every alert write would update the wide copy).
+# Its leading user_id column also serves every "WHERE user_id = ..." lookup and
+# the users FK, so the model's single-column ix_alerts_user_id is redundant
+# and dropped to keep alert writes at one user index.
+# The alerts worker reads "WHERE enabled = TRUE ORDER BY id LIMIT 500"; a
+# partial index on id returns those rows already in order.
+# (user_id, user_seq) is already unique via migrate_user_seq.py.
+SQL = """
+-- replaces the earlier covering variant (INCLUDE user_seq, symbol, ...)
+DROP INDEX IF EXISTS idx_alerts_user_id_desc;
+CREATE INDEX IF NOT EXISTS idx_alerts_user_id_id_desc ON alerts (user_id, id DESC);
+DROP INDEX IF EXISTS ix_alerts_user_id;
+
+-- replaces the earlier (user_id) WHERE enabled variant
+DROP INDEX IF EXISTS idx_alerts_enabled_user;
+CREATE INDEX IF NOT EXISTS idx_alerts_enabled_id ON alerts (id) WHERE enabled;
+"""
+
+if __name__ == "__main__":
+    print("[migrate alerts indexes] starting…")
+    with session_scope() as s:
+        s.execute(text(SQL))
+    print("[migrate alerts indexes] ok ✅")
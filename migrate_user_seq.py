@@ -1,6 +1,7 @@
 # migrate_user_seq.py
 from sqlalchemy import text
 from db import session_scope
+from models_extras import init_extras, SYNC_ALERT_COUNTERS_SQL
 
 SQL = """
 ALTER TABLE alerts ADD COLUMN IF NOT EXISTS user_seq INTEGER;
@@ -28,8 +29,11 @@ END$$;
 
 if __name__ == "__main__":
     print("[migrate user_seq] starting…")
+    init_extras()  # user_alert_counters must exist for the backfill below
     with session_scope() as s:
         s.execute(text(SQL))
+        # one-off: start every user's counter after their highest user_seq
+        s.execute(text(SYNC_ALERT_COUNTERS_SQL), {"uid": None})
         row = s.execute(text("SELECT COUNT(*) FROM alerts")).first()
         print(f"[migrate user_seq] done. alerts_total={row[0]}")
     print("[migrate user_seq] ok ✅")
@@ -23,6 +23,26 @@ CREATE TABLE IF NOT EXISTS user_settings (
 );
 """
 
+# Per-user alert numbering. /setalert takes the next user_seq from here with one
+# upsert instead of scanning alerts for MAX(user_seq). SYNC_ALERT_COUNTERS_SQL
+# moves counters past existing rows: once for all users from migrate_user_seq.py,
+# and per user when an insert hits the unique (user_id, user_seq) index.
+_USER_ALERT_COUNTERS_DDL = """
+CREATE TABLE IF NOT EXISTS user_alert_counters (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    next_seq BIGINT NOT NULL
+);
+"""
+
+SYNC_ALERT_COUNTERS_SQL = """
+INSERT INTO user_alert_counters (user_id, next_seq)
+SELECT user_id, MAX(user_seq) + 1 FROM alerts
+WHERE user_seq IS NOT NULL AND (CAST(:uid AS INTEGER) IS NULL OR user_id = :uid)
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE
+SET next_seq = GREATEST(user_alert_counters.next_seq, EXCLUDED.next_seq);
+"""
+
 _CREATE_USER_BY_TG = """
 INSERT INTO users (telegram_id, is_premium)
 SELECT :tg, FALSE
@@ -33,9 +53,11 @@ RETURNING id;
 _SELECT_USER_ID = "SELECT id FROM users WHERE telegram_id = :tg;"
 
 def init_extras() -> None:
-    """Create extra tables if missing (idempotent)."""
+    """Create extra tables if missing (idempotent). Alerts indexes live in
+    migrate_alerts_indexes.py: they depend on migration-only columns."""
     with engine.connect() as conn:
         conn.execute(text(_USER_SETTINGS_DDL))
+        conn.execute(text(_USER_ALERT_COUNTERS_DDL))
         conn.commit()
 
 # --- Internal helpers --------------------------------------------------------
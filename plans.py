@@ -1,12 +1,18 @@
 # plans.py
 from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Tuple
 from sqlalchemy import text
 from db import session_scope
 
-@dataclass
+# Instances are shared through _PLAN_CACHE, so they are immutable; slots keep
+# each cached entry small.
+@dataclass(frozen=True, slots=True)
 class PlanInfo:
     user_id: int
     telegram_id: str
@@ -16,35 +22,61 @@ class PlanInfo:
     alerts_count: int
     trial_expires_at: str | None
 
+def _expiry_epoch(dt: datetime) -> float:
+    """Epoch seconds for a stored trial expiry. Stored values are naive UTC,
+    but an offset-aware one compares correctly too (a naive/aware datetime
+    comparison would raise and silently drop the trial)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+# One round trip per cache miss for existing users: the user row, alert count
+# and latest trial row together. Only a first contact pays for the INSERT.
+_PLAN_SQL = text(
+    """
+    SELECT u.id, u.is_premium,
+           (SELECT COUNT(*) FROM alerts a WHERE a.user_id = u.id) AS alerts_count,
+           CASE WHEN :is_admin THEN NULL ELSE (
+               SELECT s.provider_sub_id FROM subscriptions s
+               WHERE s.user_id = u.id AND s.provider = 'trial'
+               ORDER BY s.created_at DESC LIMIT 1
+           ) END AS trial_psid
+    FROM users u
+    WHERE u.telegram_id = :tg
+    """
+)
+
+_CREATE_USER_SQL = text(
+    "INSERT INTO users (telegram_id, is_premium, created_at, updated_at) "
+    "VALUES (:tg, FALSE, NOW(), NOW()) ON CONFLICT (telegram_id) DO NOTHING"
+)
+
 def build_plan_info(telegram_id: str, admin_ids: set[str] | None = None) -> PlanInfo:
     admin_ids = admin_ids or set()
+    # Admins are unlimited regardless of trial state; skip the trial lookup.
+    is_admin = telegram_id in admin_ids
+    params = {"tg": telegram_id, "is_admin": is_admin}
     with session_scope() as session:
-        row = session.execute(text("SELECT id, is_premium FROM users WHERE telegram_id = :tg"), {"tg": telegram_id}).mappings().first()
+        row = session.execute(_PLAN_SQL, params).mappings().first()
         if not row:
-            session.execute(text("INSERT INTO users (telegram_id, is_premium, created_at, updated_at) VALUES (:tg, FALSE, NOW(), NOW())"), {"tg": telegram_id})
-            row = session.execute(text("SELECT id, is_premium FROM users WHERE telegram_id = :tg"), {"tg": telegram_id}).mappings().first()
+            session.execute(_CREATE_USER_SQL, {"tg": telegram_id})
+            row = session.execute(_PLAN_SQL, params).mappings().first()
         user_id = row["id"]
         is_premium = bool(row["is_premium"])
-        alerts_count = int(session.execute(text("SELECT COUNT(*) FROM alerts WHERE user_id = :uid"), {"uid": user_id}).scalar() or 0)
+        alerts_count = int(row["alerts_count"] or 0)
 
-        trial_row = session.execute(
-            text("SELECT provider_sub_id FROM subscriptions WHERE user_id = :uid AND provider = 'trial' ORDER BY created_at DESC LIMIT 1"),
-            {"uid": user_id}
-        ).mappings().first()
         trial_expires = None
         has_unlimited = is_premium
-        if trial_row:
-            psid = trial_row.get("provider_sub_id")
-            try:
-                if psid:
-                    dt = datetime.fromisoformat(psid)
-                    trial_expires = dt.isoformat()
-                    if dt > datetime.utcnow():
-                        has_unlimited = True
-            except Exception:
-                trial_expires = None
-
-        is_admin = telegram_id in admin_ids
+        psid = row["trial_psid"]
+        try:
+            if psid:
+                dt = datetime.fromisoformat(psid)
+                trial_expires = dt.isoformat()
+                if _expiry_epoch(dt) > time.time():
+                    has_unlimited = True
+        except Exception:
+            trial_expires = None
+
         if is_admin:
             has_unlimited = True
 
@@ -52,6 +84,59 @@ def build_plan_info(telegram_id: str, admin_ids: set[str] | None = None) -> Plan
                         is_premium=is_premium, has_unlimited=has_unlimited,
                         alerts_count=alerts_count, trial_expires_at=trial_expires)
 
+# ── Short-lived per-user cache ────────────────────────────────────────────
+# Handlers resolve the plan on nearly every update; a returning user pressing
+# buttons in a burst should hit the DB once per TTL, not once per press.
+# Callers that change plan inputs (alerts, trials, premium) must invalidate.
+
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL_SECONDS", "30"))
+PLAN_CACHE_MAX = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "10000"))
+# LRU order: oldest first. Filled from worker threads (asyncio.to_thread), hence the lock.
+_PLAN_CACHE: "OrderedDict[tuple[str, bool], tuple[float, PlanInfo]]" = OrderedDict()
+_PLAN_CACHE_LOCK = threading.Lock()
+
+def _plan_cache_get(key: tuple[str, bool]) -> PlanInfo | None:
+    with _PLAN_CACHE_LOCK:
+        hit = _PLAN_CACHE.get(key)
+        if hit is None:
+            return None
+        if time.time() - hit[0] >= PLAN_CACHE_TTL:
+            del _PLAN_CACHE[key]
+            return None
+        _PLAN_CACHE.move_to_end(key)
+        return hit[1]
+
+def build_plan_info_cached(telegram_id: str, admin_ids: set[str] | None = None) -> PlanInfo:
+    key = (telegram_id, telegram_id in (admin_ids or ()))
+    plan = _plan_cache_get(key)
+    if plan is not None:
+        return plan
+    plan = build_plan_info(telegram_id, admin_ids)
+    with _PLAN_CACHE_LOCK:
+        _PLAN_CACHE[key] = (time.time(), plan)
+        _PLAN_CACHE.move_to_end(key)
+        while len(_PLAN_CACHE) > PLAN_CACHE_MAX:
+            _PLAN_CACHE.popitem(last=False)
+    return plan
+
+def cached_plan_info(telegram_id: str, admin_ids: set[str] | None = None) -> PlanInfo | None:
+    """Return the cached plan if still fresh, without touching the DB."""
+    return _plan_cache_get((telegram_id, telegram_id in (admin_ids or ())))
+
+def prune_plan_cache() -> int:
+    """Drop entries past their TTL; returns how many were removed."""
+    cutoff = time.time() - PLAN_CACHE_TTL
+    with _PLAN_CACHE_LOCK:
+        stale = [k for k, (ts, _) in _PLAN_CACHE.items() if ts <= cutoff]
+        for k in stale:
+            del _PLAN_CACHE[k]
+    return len(stale)
+
+def invalidate_plan(telegram_id: str) -> None:
+    with _PLAN_CACHE_LOCK:
+        _PLAN_CACHE.pop((telegram_id, False), None)
+        _PLAN_CACHE.pop((telegram_id, True), None)
+
 def can_create_alert(plan: PlanInfo) -> Tuple[bool, str, int | None]:
     # Unlimited during active trial/premium/admin
     if plan.has_unlimited:
@@ -2,33 +2,46 @@
 from __future__ import annotations
 
 import os
-import re
+import hmac
+import html
+import signal
+import asyncio
 import time
-import threading
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
 
-import requests
+import orjson
 import uvicorn
-from fastapi import FastAPI, Query
-from fastapi.responses import RedirectResponse, PlainTextResponse, JSONResponse
+try:
+    import uvloop  # libuv event loop; not available on Windows
+except ImportError:
+    uvloop = None
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import RedirectResponse, PlainTextResponse, ORJSONResponse, Response
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
 from telegram.error import Conflict, TimedOut as TgTimedOut
-from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
+from telegram.ext import AIORateLimiter, Application, CommandHandler, ContextTypes, CallbackQueryHandler
+from telegram.request import HTTPXRequest
 
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
 # Local modules
-from db import init_db, session_scope, engine
-from worker_logic import run_alert_cycle, resolve_symbol, fetch_price_binance
+from db import init_db, session_scope, lock_engine
+from http_client import async_client, aclose_async_client
+from worker_logic import run_alert_cycle, resolve_symbol, fetch_price_binance_async
 from commands_extra import register_extra_handlers
-from worker_extra import start_pump_watcher
-from models_extras import init_extras
-from plans import build_plan_info, can_create_alert, plan_status_line
-from altcoins_info import get_off_binance_info, list_off_binance, list_presales
-from commands_admin import register_admin_handlers  # Admin module
+from worker_extra import daily_news_loop
+from models_extras import init_extras, SYNC_ALERT_COUNTERS_SQL
+from plans import (build_plan_info_cached, cached_plan_info, invalidate_plan, prune_plan_cache,
+                   can_create_alert, plan_status_line)
+from altcoins_info import get_off_binance_html, list_off_binance, list_presales
+from commands_admin import register_admin_handlers, next_trial_expiry  # Admin module
 
 # ─────────────────────────── ENV / CONFIG ───────────────────────────
 
@@ -37,15 +50,30 @@ WEB_URL = (os.getenv("WEB_URL") or "").strip() or None
 ADMIN_KEY = (os.getenv("ADMIN_KEY") or "").strip() or None
 
 INTERVAL_SECONDS = int(os.getenv("WORKER_INTERVAL_SECONDS", "60"))
+# Floor between two alert cycles, so a burst of /setalert NOTIFYs shares one
+# cycle (and one Binance fetch) instead of triggering one each.
+ALERTS_MIN_GAP_SECONDS = min(INTERVAL_SECONDS, int(os.getenv("ALERTS_MIN_GAP_SECONDS", "10")))
 
 # PayPal disabled
 PAYPAL_PLAN_ID = None
 PAYPAL_SUBSCRIBE_URL = None
 
 RUN_BOT = os.getenv("RUN_BOT", "1") == "1"
+# BOT_MODE=webhook: Telegram pushes updates to WEB_URL/tg/<TG_WEBHOOK_SECRET>
+# instead of this process long-polling getUpdates. Needs both values set; the
+# secret is also sent back in X-Telegram-Bot-Api-Secret-Token, so it must be
+# 1-256 chars of A-Z, a-z, 0-9, _ and -.
+TG_WEBHOOK_SECRET = (os.getenv("TG_WEBHOOK_SECRET") or "").strip() or None
+BOT_WEBHOOK_MODE = os.getenv("BOT_MODE", "polling").strip().lower() == "webhook"
+if BOT_WEBHOOK_MODE and not (WEB_URL and TG_WEBHOOK_SECRET):
+    print({"msg": "bot_webhook_mode_missing_config", "fallback": "polling"})
+    BOT_WEBHOOK_MODE = False
 RUN_ALERTS = os.getenv("RUN_ALERTS", "1") == "1"
 
-_ADMIN_IDS = {s.strip() for s in (os.getenv("ADMIN_TELEGRAM_IDS") or "").split(",") if s.strip()}
+_ADMIN_IDS = frozenset(s.strip() for s in (os.getenv("ADMIN_TELEGRAM_IDS") or "").split(",") if s.strip())
+# Chat ids to message; a malformed env entry is skipped rather than breaking
+# every admin notification with a ValueError.
+_ADMIN_CHAT_IDS = tuple(int(a) for a in _ADMIN_IDS if a.isdigit())
 BOT_LOCK_ID = int(os.getenv("BOT_LOCK_ID", "911001"))
 ALERTS_LOCK_ID = int(os.getenv("ALERTS_LOCK_ID", "911002"))
 
@@ -62,56 +90,150 @@ if not BOT_TOKEN:
 _BINANCE_SYMBOLS: dict[str, str] = {}   # base → pair (e.g., BTC -> BTCUSDT)
 _BINANCE_LAST_FETCH = 0.0
 _BINANCE_TTL = int(os.getenv("BINANCE_EXCHANGEINFO_TTL", "3600"))  # seconds
+# Unknown symbols may force a refresh, but at most once per this many seconds
+# so a stream of made-up tickers can't re-download exchangeInfo each time.
+_BINANCE_FORCE_MIN_INTERVAL = int(os.getenv("BINANCE_FORCE_REFRESH_MIN_SECONDS", "300"))
+_BINANCE_LAST_FORCED = 0.0
 
-def _refresh_binance_symbols(force: bool = False):
+# Single-flight guard: concurrent callers past the TTL share one fetch.
+_BINANCE_REFRESH_LOCK = asyncio.Lock()
+_BINANCE_REFRESH_TASK: asyncio.Task | None = None
+
+async def _refresh_binance_symbols(force: bool = False):
     """Refresh Binance USDT trading pairs and keep a base->symbol map."""
     global _BINANCE_LAST_FETCH, _BINANCE_SYMBOLS
-    now = time.time()
-    if (not force) and (now - _BINANCE_LAST_FETCH < _BINANCE_TTL) and _BINANCE_SYMBOLS:
+    asked_at = time.time()
+    if (not force) and (asked_at - _BINANCE_LAST_FETCH < _BINANCE_TTL) and _BINANCE_SYMBOLS:
         return
-    try:
-        r = requests.get("https://api.binance.com/api/v3/exchangeInfo", timeout=15)
-        data = r.json()
-        mapping = {}
-        for s in data.get("symbols", []):
-            if s.get("status") != "TRADING":
-                continue
-            base = s.get("baseAsset", "")
-            quote = s.get("quoteAsset", "")
-            symbol = s.get("symbol", "")
-            if quote == "USDT" and base and symbol:
-                mapping[base.upper()] = symbol.upper()
-        if mapping:
-            _BINANCE_SYMBOLS = mapping
-            _BINANCE_LAST_FETCH = now
-            print({"msg": "binance_symbols_loaded", "count": len(mapping)})
-    except Exception as e:
-        print({"msg": "binance_symbols_error", "error": str(e)})
-
-def resolve_symbol_auto(symbol: str | None) -> str | None:
+    async with _BINANCE_REFRESH_LOCK:
+        # Double-check: another coroutine may have refreshed while we waited.
+        if _BINANCE_LAST_FETCH >= asked_at:
+            return
+        now = time.time()
+        try:
+            r = await async_client().get("https://api.binance.com/api/v3/exchangeInfo")
+            data = r.json()
+            mapping = {}
+            for s in data.get("symbols", []):
+                if s.get("status") != "TRADING":
+                    continue
+                base = s.get("baseAsset", "")
+                quote = s.get("quoteAsset", "")
+                symbol = s.get("symbol", "")
+                if quote == "USDT" and base and symbol:
+                    mapping[base.upper()] = symbol.upper()
+            if mapping:
+                _BINANCE_SYMBOLS = mapping
+                _BINANCE_LAST_FETCH = now
+                # Drop cached misses that the new listing now resolves.
+                for k in [k for k, (_, pair) in _SYMBOL_CACHE.items() if not pair and k in mapping]:
+                    del _SYMBOL_CACHE[k]
+                print({"msg": "binance_symbols_loaded", "count": len(mapping)})
+        except Exception as e:
+            print({"msg": "binance_symbols_error", "error": str(e)})
+
+def _schedule_binance_refresh() -> None:
+    """Kick off a background refresh unless one is already running."""
+    global _BINANCE_REFRESH_TASK
+    if _BINANCE_REFRESH_TASK is None or _BINANCE_REFRESH_TASK.done():
+        _BINANCE_REFRESH_TASK = asyncio.get_running_loop().create_task(_refresh_binance_symbols())
+
+# Resolved symbol → pair, with negative results cached as "" so repeated
+# unknown symbols don't keep forcing exchangeInfo refreshes. Misses expire
+# much sooner so a fresh listing becomes usable within a minute or two.
+_SYMBOL_CACHE_MAX = int(os.getenv("SYMBOL_CACHE_MAX_ENTRIES", "5000"))
+_SYMBOL_NEG_TTL = int(os.getenv("SYMBOL_NEGATIVE_TTL_SECONDS", "90"))
+_SYMBOL_CACHE: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+async def resolve_symbol_auto(symbol: str | None) -> str | None:
     """Try current mapping, otherwise ask Binance (cached) for new listings."""
     if not symbol:
         return None
     symbol = symbol.upper().strip()
+    hit = _SYMBOL_CACHE.get(symbol)
+    if hit and time.time() - hit[0] < (_BINANCE_TTL if hit[1] else _SYMBOL_NEG_TTL):
+        _SYMBOL_CACHE.move_to_end(symbol)
+        return hit[1] or None
+    pair = await _resolve_symbol_uncached(symbol)
+    _lru_put(_SYMBOL_CACHE, symbol, (time.time(), pair or ""), _SYMBOL_CACHE_MAX)
+    return pair
+
+async def _resolve_symbol_uncached(symbol: str) -> str | None:
+    global _BINANCE_LAST_FORCED
     # 1) your static mapping (worker_logic.resolve_symbol)
     pair = resolve_symbol(symbol)
     if pair:
         return pair
-    # 2) cached Binance listing
-    _refresh_binance_symbols()
+    # 2) cached Binance listing; once loaded, a stale map is served as-is
+    #    while a single background task revalidates it
+    if not _BINANCE_SYMBOLS:
+        await _refresh_binance_symbols()
+    elif time.time() - _BINANCE_LAST_FETCH >= _BINANCE_TTL:
+        _schedule_binance_refresh()
+        return _BINANCE_SYMBOLS.get(symbol)
     pair = _BINANCE_SYMBOLS.get(symbol)
     if pair:
         return pair
-    # 3) force refresh once
-    _refresh_binance_symbols(force=True)
+    # 3) force refresh once (rate-limited process-wide)
+    if time.time() - _BINANCE_LAST_FORCED < _BINANCE_FORCE_MIN_INTERVAL:
+        return None
+    _BINANCE_LAST_FORCED = time.time()
+    await _refresh_binance_symbols(force=True)
     return _BINANCE_SYMBOLS.get(symbol)
 
 # ───────────────────────── Small helpers ─────────────────────────────
 
+def _utcnow() -> datetime:
+    """Naive UTC now, matching how trial expiries are stored; avoids the
+    deprecated datetime.utcnow()."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 def target_msg(update: Update):
     """Return a message target compatible with commands & callbacks."""
     return update.message or (update.callback_query.message if update.callback_query else None)
 
+def _lru_put(cache: OrderedDict, key, value, maxsize: int) -> None:
+    """Insert/refresh `key` as most recent and evict the oldest past `maxsize`.
+    Callers stay on the event loop, so no lock is needed."""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+# Per-user state below is keyed by tg_id and capped so every user who ever
+# talked to the bot doesn't stay resident for the life of the process.
+_USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX_ENTRIES", "100000"))
+
+# Per-user token bucket in front of the DB-backed commands and callbacks.
+# Only touched from the event loop, so a plain OrderedDict is enough.
+_RL_CAPACITY = float(os.getenv("USER_RATE_BURST", "5"))
+_RL_REFILL_PER_SEC = _RL_CAPACITY / float(os.getenv("USER_RATE_WINDOW_SECONDS", "60"))
+_RL_BUCKETS: "OrderedDict[str, tuple[float, float]]" = OrderedDict()  # tg_id -> (tokens, last refill)
+_RL_DENIED_TEXT = "⏳ Slow down a little and try again in a few seconds."
+
+def _rate_ok(tg_id: str, cost: float = 1.0) -> bool:
+    """Spend `cost` tokens from the user's bucket; False when it runs dry."""
+    if tg_id in _ADMIN_IDS:
+        return True
+    now = time.monotonic()
+    tokens, last = _RL_BUCKETS.get(tg_id, (_RL_CAPACITY, now))
+    tokens = min(_RL_CAPACITY, tokens + (now - last) * _RL_REFILL_PER_SEC)
+    if tokens < cost:
+        _lru_put(_RL_BUCKETS, tg_id, (tokens, now), _USER_CACHE_MAX)
+        return False
+    _lru_put(_RL_BUCKETS, tg_id, (tokens - cost, now), _USER_CACHE_MAX)
+    return True
+
+def _acquire_advisory_lock(lock_id: int):
+    """Hold a session advisory lock on a dedicated (non-pooled) connection.
+    Returns the open connection when the lock was granted, else None."""
+    conn = lock_engine.connect()
+    got = conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar()
+    if not got:
+        conn.close()
+        return None
+    return conn
+
 # ██ TRIAL helpers (adaptive to schema) ██████████████████████████████
 
 def _subscriptions_columns(session) -> set[str]:
@@ -144,6 +266,34 @@ def _insert_trial_row(session, user_id: int, expiry_iso: str) -> None:
             "VALUES (:uid, 'trial', :expiry, NOW(), NOW())"
         ), p)
 
+class TrialState(NamedTuple):
+    found: bool                 # a trial row with an expiry value exists
+    expiry: datetime | None     # naive UTC; None when missing/unparseable
+
+_TRIAL_SELECT = (
+    "SELECT provider_sub_id FROM subscriptions WHERE user_id=:uid AND provider='trial' "
+    "ORDER BY created_at DESC LIMIT 1"
+)
+
+def _trial_state_from_row(row) -> TrialState:
+    raw = row.get("provider_sub_id") if row else None
+    if not raw:
+        return TrialState(False, None)
+    try:
+        # normalize to naive UTC for comparison
+        return TrialState(True, datetime.fromisoformat(raw).replace(tzinfo=None))
+    except ValueError:
+        return TrialState(True, None)
+
+def _trial_status_line(state: TrialState) -> str:
+    if not state.found:
+        return "Trial: no active trial — contact admin"
+    if state.expiry is None:
+        return "Trial: unknown — contact admin"
+    if state.expiry > _utcnow():
+        return f"Trial expires: {state.expiry.date().isoformat()}"
+    return "Trial: expired — contact admin"
+
 def _trial_status_line_for(tg_id: str | None) -> str:
     if not tg_id:
         return "Trial: unknown user"
@@ -158,41 +308,24 @@ def _trial_status_line_for(tg_id: str | None) -> str:
             LIMIT 1
             """
         ), {"tg": tg_id}).mappings().first()
-        if not row or not row.get("provider_sub_id"):
-            return "Trial: no active trial — contact admin"
-        try:
-            expiry = datetime.fromisoformat(row["provider_sub_id"])
-            # normalize to naive UTC for comparison
-            expiry_naive = expiry.replace(tzinfo=None)
-            now = datetime.utcnow()
-            if expiry_naive > now:
-                return f"Trial expires: {expiry_naive.date().isoformat()}"
-            return "Trial: expired — contact admin"
-        except Exception:
-            return "Trial: unknown — contact admin"
+    return _trial_status_line(_trial_state_from_row(row))
 
-async def _ensure_trial_row(user_id: int, trial_days: int = TRIAL_DAYS) -> str:
-    now = datetime.utcnow()
+def _ensure_trial_row(user_id: int, trial_days: int = TRIAL_DAYS) -> tuple[str, TrialState]:
+    """Create the trial on first use. Returns (start-message suffix, trial state)
+    so callers can render the status line without querying again."""
+    now = _utcnow()
     with session_scope() as session:
-        row = session.execute(text(
-            "SELECT provider_sub_id FROM subscriptions WHERE user_id=:uid AND provider='trial' "
-            "ORDER BY created_at DESC LIMIT 1"
-        ), {"uid": user_id}).mappings().first()
+        row = session.execute(text(_TRIAL_SELECT), {"uid": user_id}).mappings().first()
         if row:
-            expiry_iso = row.get("provider_sub_id")
-            try:
-                expiry = datetime.fromisoformat(expiry_iso) if expiry_iso else None
-            except Exception:
-                expiry = None
-            if expiry:
-                expiry_naive = expiry.replace(tzinfo=None)
-                if expiry_naive > now:
-                    days_left = (expiry_naive - now).days
-                    return f"\n\n✅ You already have an active free trial for {days_left} more day(s)."
-            return "\n\n⚠️ Your previous free trial has expired. To get more days, please contact the admin."
+            state = _trial_state_from_row(row)
+            if state.expiry and state.expiry > now:
+                days_left = (state.expiry - now).days
+                return f"\n\n✅ You already have an active free trial for {days_left} more day(s).", state
+            return "\n\n⚠️ Your previous free trial has expired. To get more days, please contact the admin.", state
         expiry = now + timedelta(days=trial_days)
         _insert_trial_row(session, user_id=user_id, expiry_iso=expiry.isoformat())
-        return f"\n\n🎁 You received a free {trial_days}-day trial with full access. It will expire on {expiry.date().isoformat()} (UTC)."
+        extra = f"\n\n🎁 You received a free {trial_days}-day trial with full access. It will expire on {expiry.date().isoformat()} (UTC)."
+        return extra, TrialState(True, expiry)
 
 # ──────────────────────── UI helpers (no PayPal) ────────────────────
 
@@ -200,144 +333,379 @@ def paypal_upgrade_url_for(tg_id: str | None) -> str | None:
     # Billing disabled — keep signature to avoid breaking other code paths
     return None
 
-def main_menu_keyboard(tg_id: str | None) -> InlineKeyboardMarkup:
-    rows = [
-        [InlineKeyboardButton("📊 Price BTC", callback_data="go:price:BTC"),
-         InlineKeyboardButton("🔔 My Alerts", callback_data="go:myalerts")],
-        [InlineKeyboardButton("⏱️ Set Alert Help", callback_data="go:setalerthelp"),
-         InlineKeyboardButton("ℹ️ Help", callback_data="go:help")],
-        [InlineKeyboardButton("🆘 Support", callback_data="go:support")],
-    ]
+# Static menu rows are shared across calls; only the trial row is per-user.
+_MAIN_MENU_ROWS = (
+    (InlineKeyboardButton("📊 Price BTC", callback_data="go:price:BTC"),
+     InlineKeyboardButton("🔔 My Alerts", callback_data="go:myalerts")),
+    (InlineKeyboardButton("⏱️ Set Alert Help", callback_data="go:setalerthelp"),
+     InlineKeyboardButton("ℹ️ Help", callback_data="go:help")),
+    (InlineKeyboardButton("🆘 Support", callback_data="go:support"),),
+)
+_REQUEST_DAYS_ROW = (InlineKeyboardButton("📩 Request more days", callback_data="req:days"),)
+
+def main_menu_keyboard(tg_id: str | None, trial: TrialState | None = None) -> InlineKeyboardMarkup:
+    rows = list(_MAIN_MENU_ROWS)
     # Trial status + request days
-    rows.append([InlineKeyboardButton(_trial_status_line_for(tg_id), callback_data="noop:trial")])
-    rows.append([InlineKeyboardButton("📩 Request more days", callback_data="req:days")])
+    status = _trial_status_line(trial) if trial is not None else _trial_status_line_for(tg_id)
+    rows.append([InlineKeyboardButton(status, callback_data="noop:trial")])
+    rows.append(_REQUEST_DAYS_ROW)
     return InlineKeyboardMarkup(rows)
 
 def upgrade_keyboard(tg_id: str | None):
     # Billing disabled
     return None
 
+# Static HTML is built once at import; only TRIAL_DAYS is interpolated.
+START_TEXT_HTML = (
+    "<b>Crypto Alerts Bot</b>\n"
+    "⚡ Fast prices • 🧪 Diagnostics • 🔔 Alerts\n\n"
+    "<b>Getting Started</b>\n"
+    "• <code>/price BTC</code> — current price\n"
+    "• <code>/setalert BTC &gt; 110000</code> — alert when condition is met\n"
+    "• <code>/myalerts</code> — list your active alerts (with delete buttons)\n"
+    "• <code>/help</code> — instructions\n"
+    "• <code>/support &lt;message&gt;</code> — contact admin support\n\n"
+    f"🎁 <b>Trial</b>: {TRIAL_DAYS} days with full/unlimited access.\n"
+    "After trial expires, contact the admin to extend access.\n\n"
+    "<b>Extra Features</b>\n"
+    "• <code>/feargreed</code> • <code>/funding [SYMBOL]</code>\n"
+    "• <code>/topgainers</code> • <code>/toplosers</code>\n"
+    "• <code>/chart &lt;SYMBOL&gt;</code> • <code>/news [N]</code>\n"
+    "• <code>/dca &lt;amount_per_buy&gt; &lt;buys&gt; &lt;symbol&gt;</code>\n"
+    "• <code>/pumplive on|off [threshold%]</code>\n"
+    "• <code>/listalts</code>, <code>/listpresales</code>, <code>/alts &lt;SYMBOL&gt;</code>\n\n"
+    "🌱 <b>New &amp; Off-Binance</b> — Try <code>/alts HYPER</code> or <code>/alts OZ</code> for info.\n"
+    "If a token gets listed on Binance later, <code>/price</code> will auto-detect it.\n"
+)
+
+HELP_TEXT_HTML = (
+    "<b>Help</b>\n\n"
+    "• <code>/price &lt;SYMBOL&gt;</code> → Spot price (auto-detects new Binance USDT listings)\n"
+    "• <code>/setalert &lt;SYMBOL&gt; &lt;op&gt; &lt;value&gt;</code>  e.g. <code>/setalert BTC &gt; 110000</code>\n"
+    "• <code>/myalerts</code> → list your alerts\n"
+    "• <code>/delalert &lt;id&gt;</code>, <code>/clearalerts</code> → Premium\n"
+    "• <code>/whoami</code> → plan info  •  <code>/cancel_autorenew</code>\n"
+    "• <code>/support &lt;message&gt;</code> → contact admins\n\n"
+    "<b>Market Tools</b>\n"
+    "• <code>/feargreed</code> • <code>/funding [SYMBOL]</code> • <code>/topgainers</code> • <code>/toplosers</code>\n"
+    "• <code>/chart &lt;SYMBOL&gt;</code> • <code>/news [N]</code> • <code>/dca &lt;amount&gt; &lt;buys&gt; &lt;symbol&gt;</code>\n"
+    "• <code>/pumplive on|off [threshold%]</code>\n\n"
+    "<b>Alts / Presales</b>\n"
+    "• <code>/alts &lt;SYMBOL&gt;</code> → notes &amp; links only\n"
+    "• <code>/listalts</code> → curated off-Binance/community\n"
+    "• <code>/listpresales</code> → curated presales (very high risk)\n"
+)
+
 def start_text() -> str:
-    return (
-        "<b>Crypto Alerts Bot</b>\n"
-        "⚡ Fast prices • 🧪 Diagnostics • 🔔 Alerts\n\n"
-        "<b>Getting Started</b>\n"
-        "• <code>/price BTC</code> — current price\n"
-        "• <code>/setalert BTC &gt; 110000</code> — alert when condition is met\n"
-        "• <code>/myalerts</code> — list your active alerts (with delete buttons)\n"
-        "• <code>/help</code> — instructions\n"
-        "• <code>/support &lt;message&gt;</code> — contact admin support\n\n"
-        f"🎁 <b>Trial</b>: {TRIAL_DAYS} days with full/unlimited access.\n"
-        "After trial expires, contact the admin to extend access.\n\n"
-        "<b>Extra Features</b>\n"
-        "• <code>/feargreed</code> • <code>/funding [SYMBOL]</code>\n"
-        "• <code>/topgainers</code> • <code>/toplosers</code>\n"
-        "• <code>/chart &lt;SYMBOL&gt;</code> • <code>/news [N]</code>\n"
-        "• <code>/dca &lt;amount_per_buy&gt; &lt;buys&gt; &lt;symbol&gt;</code>\n"
-        "• <code>/pumplive on|off [threshold%]</code>\n"
-        "• <code>/listalts</code>, <code>/listpresales</code>, <code>/alts &lt;SYMBOL&gt;</code>\n\n"
-        "🌱 <b>New &amp; Off-Binance</b> — Try <code>/alts HYPER</code> or <code>/alts OZ</code> for info.\n"
-        "If a token gets listed on Binance later, <code>/price</code> will auto-detect it.\n"
-    )
+    return START_TEXT_HTML
 
 def safe_chunks(s: str, limit: int = 3800):
-    while s:
-        yield s[:limit]
-        s = s[limit:]
+    """Split into <= limit pieces, breaking after a newline where possible so
+    HTML tags are not cut in half. A newline only counts if it keeps the piece
+    over half the limit; otherwise the cut just avoids landing inside a tag."""
+    i, n = 0, len(s)
+    while i < n:
+        end = min(i + limit, n)
+        if end < n:
+            nl = s.rfind("\n", i, end)
+            if nl > i + limit // 2:
+                end = nl + 1
+            else:
+                lt = s.rfind("<", i, end)
+                if lt > i and lt > s.rfind(">", i, end):
+                    end = lt
+        yield s[i:end]
+        i = end
+
+_HELP_CHUNKS = tuple(safe_chunks(HELP_TEXT_HTML))
 
 def op_from_rule(rule: str) -> str:
     return ">" if rule == "price_above" else "<"
 
 # ─────────────────────────── FastAPI Health ─────────────────────────
 
-health_app = FastAPI()
-_BOT_HEART_BEAT_AT = None
-_BOT_HEART_STATUS = "unknown"
-_ALERTS_LAST_OK_AT = None
-_ALERTS_LAST_RESULT = None
+_BOT_FAILED = False
 
+def _on_bot_task_done(task: asyncio.Task) -> None:
+    global _BOT_FAILED
+    if task.cancelled():
+        return
+    server = getattr(health_app.state, "server", None)
+    if task.exception() is not None:
+        # A crashed bot must take the process down so the platform restarts
+        # it, rather than leaving /health green with no bot or alerts loop.
+        print({"msg": "bot_task_error", "error": repr(task.exception())})
+        _BOT_FAILED = True
+        if server is not None:
+            server.should_exit = True
+        else:
+            # Started by the uvicorn CLI: ask it to shut down the same way.
+            os.kill(os.getpid(), signal.SIGTERM)
+        return
+    if task.result() is False and server is not None:
+        # Launched via main(): without the bot this process has nothing to do.
+        server.should_exit = True
+
+@asynccontextmanager
+async def _health_lifespan(app: FastAPI):
+    """Server lifetime = bot lifetime, whether started by main() or by the
+    uvicorn CLI (start.sh). Schema setup runs first, then the shared HTTP
+    client, then the bot in the background so health checks answer while it
+    connects."""
+    await asyncio.to_thread(init_db)
+    await asyncio.to_thread(init_extras)
+    # Created here so it is bound to the serving loop before any handler or
+    # task touches it.
+    app.state.http_client = async_client()
+    stop = asyncio.Event()
+    bot_task = asyncio.create_task(run_bot(stop))
+    bot_task.add_done_callback(_on_bot_task_done)
+    try:
+        yield
+    finally:
+        stop.set()
+        try:
+            await asyncio.wait_for(bot_task, timeout=30)
+        except Exception as e:
+            print({"msg": "bot_shutdown_error", "error": repr(e)})
+        await aclose_async_client()
+
+# orjson (C extension) instead of stdlib json for every JSON body; the two
+# constant responses are built once here and returned as-is on every probe.
+health_app = FastAPI(lifespan=_health_lifespan, default_response_class=ORJSONResponse)
+_ROOT_RESPONSE = ORJSONResponse({"ok": True, "service": "crypto-alerts-server"})
+_HEALTH_RESPONSE = ORJSONResponse({"status": "ok"})
+def _utc_iso_z() -> str:
+    return _utcnow().isoformat() + "Z"
+
+# /botok and /alertsok bodies only change when a heartbeat or alert cycle
+# stamps new state, so they are serialized there and probes just send bytes.
+# Each endpoint's state is one tuple/bytes global replaced by a single store,
+# so a probe never sees the stamp of one beat paired with another's body.
+def _botok_state(status: str, last_iso: str | None, mono: float | None) -> tuple[float | None, bytes, bytes]:
+    """(monotonic stamp for staleness math, fresh body, stale body)."""
+    body = {
+        "bot": status,
+        "last": last_iso,
+        "ttl_seconds": _BOT_HEART_TTL,
+        "interval_seconds": _BOT_HEART_INTERVAL,
+    }
+    return mono, orjson.dumps(body), orjson.dumps({**body, "bot": "stale"})
+
+def _alertsok_body(last_ok_iso: str | None, last_result: dict | None) -> bytes:
+    return orjson.dumps({
+        "last_ok": last_ok_iso,
+        "last_result": last_result or {},
+        "expected_interval_seconds": INTERVAL_SECONDS,
+    })
+
+_BOTOK_STATE = _botok_state("unknown", None, None)
+_ALERTSOK_BODY = _alertsok_body(None, None)
+
+# Health routes are async: they only read module state, so running them on the
+# loop avoids a threadpool hop per probe (FastAPI offloads plain `def` routes).
 @health_app.api_route("/", methods=["GET", "HEAD"])
-def root():
-    return {"ok": True, "service": "crypto-alerts-server"}
+async def root():
+    return _ROOT_RESPONSE
 
 @health_app.api_route("/health", methods=["GET", "HEAD"])
-def health():
-    return {"status": "ok"}
+async def health():
+    return _HEALTH_RESPONSE
 
 @health_app.api_route("/botok", methods=["GET", "HEAD"])
-def botok():
-    now = datetime.utcnow()
-    stale = (_BOT_HEART_BEAT_AT is None) or ((now - _BOT_HEART_BEAT_AT) > timedelta(seconds=_BOT_HEART_TTL))
-    return {
-        "bot": ("stale" if stale else _BOT_HEART_STATUS),
-        "last": (_BOT_HEART_BEAT_AT.isoformat() + "Z") if _BOT_HEART_BEAT_AT else None,
-        "ttl_seconds": _BOT_HEART_TTL,
-        "interval_seconds": _BOT_HEART_INTERVAL,
-    }
+async def botok():
+    mono, fresh, stale_body = _BOTOK_STATE
+    stale = (mono is None) or ((time.monotonic() - mono) > _BOT_HEART_TTL)
+    return Response(stale_body if stale else fresh, media_type="application/json")
 
 @health_app.api_route("/alertsok", methods=["GET", "HEAD"])
-def alertsok():
-    return {
-        "last_ok": (_ALERTS_LAST_OK_AT.isoformat() + "Z") if _ALERTS_LAST_OK_AT else None,
-        "last_result": _ALERTS_LAST_RESULT or {},
-        "expected_interval_seconds": INTERVAL_SECONDS,
-    }
+async def alertsok():
+    return Response(_ALERTSOK_BODY, media_type="application/json")
+
+@health_app.post("/tg/{secret}")
+async def telegram_webhook(secret: str, request: Request):
+    header = request.headers.get("x-telegram-bot-api-secret-token", "")
+    if (not TG_WEBHOOK_SECRET
+            or not hmac.compare_digest(secret, TG_WEBHOOK_SECRET)
+            or not hmac.compare_digest(header, TG_WEBHOOK_SECRET)):
+        return PlainTextResponse("forbidden", status_code=403)
+    app = getattr(request.app.state, "bot_app", None)  # set by run_bot while running
+    if app is None:
+        # Telegram retries non-2xx deliveries, so nothing is lost while starting.
+        return PlainTextResponse("bot not running", status_code=503)
+    update = Update.de_json(await request.json(), app.bot)
+    await app.update_queue.put(update)
+    return PlainTextResponse("ok")
 
 # PayPal route disabled (returns 410)
 @health_app.api_route("/billing/paypal/start", methods=["GET", "HEAD"])
 def paypal_start_disabled():
-    return JSONResponse({"error": "billing disabled"}, status_code=410)
+    return ORJSONResponse({"error": "billing disabled"}, status_code=410)
 
-def bot_heartbeat_loop():
-    global _BOT_HEART_BEAT_AT, _BOT_HEART_STATUS
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/getMe"
+async def bot_heartbeat_loop(bot):
+    """getMe through the bot's own connection pool, the one handlers reply on,
+    so the probe rides a warm keep-alive connection."""
+    global _BOTOK_STATE
     print({"msg": "bot_heartbeat_started", "interval": _BOT_HEART_INTERVAL})
+    loop = asyncio.get_running_loop()
     while True:
+        deadline = loop.time() + _BOT_HEART_INTERVAL
         try:
-            r = requests.get(url, timeout=10)
-            _BOT_HEART_STATUS = "ok" if (r.status_code == 200 and r.json().get("ok") is True) else "fail"
+            await bot.get_me(read_timeout=10)
+            status = "ok"
         except Exception:
-            _BOT_HEART_STATUS = "fail"
-        _BOT_HEART_BEAT_AT = datetime.utcnow()
-        time.sleep(_BOT_HEART_INTERVAL)
+            status = "fail"
+        _BOTOK_STATE = _botok_state(status, _utc_iso_z(), time.monotonic())
+        await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+# LRU caps bound the per-user maps; this sweep also drops entries that have
+# gone stale so an idle process shrinks back to the currently active users.
+_CACHE_SWEEP_INTERVAL = int(os.getenv("CACHE_SWEEP_INTERVAL_SECONDS", "300"))
+
+def _sweep_caches() -> dict:
+    now_mono, now_wall = time.monotonic(), time.time()
+    # A bucket idle long enough to refill completely is the same as no bucket.
+    full_after = _RL_CAPACITY / _RL_REFILL_PER_SEC
+    buckets = [k for k, (_, last) in _RL_BUCKETS.items() if now_mono - last >= full_after]
+    for k in buckets:
+        del _RL_BUCKETS[k]
+    listings = [k for k, ts in _MYALERTS_LAST.items() if now_wall - ts >= _MYALERTS_MIN_INTERVAL]
+    for k in listings:
+        del _MYALERTS_LAST[k]
+    symbols = [k for k, (ts, pair) in _SYMBOL_CACHE.items()
+               if now_wall - ts >= (_BINANCE_TTL if pair else _SYMBOL_NEG_TTL)]
+    for k in symbols:
+        del _SYMBOL_CACHE[k]
+    return {"rate_buckets": len(buckets), "myalerts": len(listings),
+            "symbols": len(symbols), "plans": prune_plan_cache()}
+
+async def cache_sweep_loop():
+    while True:
+        await asyncio.sleep(_CACHE_SWEEP_INTERVAL)
+        try:
+            removed = _sweep_caches()
+            if any(removed.values()):
+                print({"msg": "cache_sweep", **removed})
+        except Exception as e:
+            print({"msg": "cache_sweep_error", "error": str(e)})
+
+# ───────────────────── Sync DB helpers (run off-loop) ────────────────
+# Handlers are async; SQLAlchemy here is sync. Every DB round trip below is
+# dispatched with asyncio.to_thread so a slow query never stalls the bot loop.
+
+async def _plan_for(tg_id: str):
+    plan = cached_plan_info(tg_id, _ADMIN_IDS)
+    if plan is not None:
+        return plan
+    return await asyncio.to_thread(build_plan_info_cached, tg_id, _ADMIN_IDS)
+
+_INSERT_ALERT_SQL = text(
+    """
+    WITH c AS (
+        INSERT INTO user_alert_counters (user_id, next_seq) VALUES (:uid, 2)
+        ON CONFLICT (user_id) DO UPDATE SET next_seq = user_alert_counters.next_seq + 1
+        RETURNING next_seq - 1 AS seq
+    )
+    INSERT INTO alerts (user_id, symbol, rule, value, cooldown_seconds, user_seq, enabled)
+    SELECT :uid, :sym, :rule, :val, :cooldown, c.seq, TRUE FROM c
+    RETURNING id, user_seq
+    """
+)
+
+def _insert_alert(user_id: int, pair: str, rule: str, val: float) -> int:
+    # The counter row serialises concurrent inserts for a user. A unique
+    # violation means the counter fell behind existing rows; resync it from
+    # alerts and retry once.
+    params = {"uid": user_id, "sym": pair, "rule": rule, "val": val, "cooldown": 900}
+    for attempt in (1, 2):
+        try:
+            with session_scope() as session:
+                user_seq = session.execute(_INSERT_ALERT_SQL, params).first().user_seq
+                # Delivered on commit; wakes alerts_loop so the new alert is
+                # evaluated right away instead of on the next interval.
+                session.execute(text(f"NOTIFY {ALERTS_CHANNEL}"))
+                return user_seq
+        except IntegrityError:
+            if attempt == 2:
+                raise
+            print({"msg": "alert_user_seq_conflict_retry", "user_id": user_id})
+            with session_scope() as session:
+                session.execute(text(SYNC_ALERT_COUNTERS_SQL), {"uid": user_id})
+
+def _fetch_user_alerts(user_id: int):
+    with session_scope() as session:
+        return session.execute(
+            text(
+                "SELECT id, user_seq, symbol, rule, value, enabled FROM alerts "
+                "WHERE user_id=:uid ORDER BY id DESC LIMIT 20"
+            ),
+            {"uid": user_id},
+        ).all()
+
+def _delete_alert(user_id: int, aid: int) -> int:
+    with session_scope() as session:
+        res = session.execute(
+            text("DELETE FROM alerts WHERE id=:id AND user_id=:uid"),
+            {"id": aid, "uid": user_id},
+        )
+        session.commit()
+        return res.rowcount or 0
+
+# One round trip: the outer SELECT sees the pre-delete snapshot, so `present`
+# still tells a foreign alert ('forbidden') from a missing one.
+_DELETE_OWN_ALERT_SQL = text(
+    """
+    WITH d AS (DELETE FROM alerts WHERE id = :id AND user_id = :uid RETURNING 1)
+    SELECT EXISTS (SELECT 1 FROM d) AS deleted,
+           EXISTS (SELECT 1 FROM alerts WHERE id = :id) AS present
+    """
+)
+
+def _delete_own_alert(user_id: int, aid: int) -> str:
+    """Delete alert `aid` if owned by `user_id`. Returns 'missing', 'forbidden' or 'deleted'."""
+    with session_scope() as s:
+        row = s.execute(_DELETE_OWN_ALERT_SQL, {"id": aid, "uid": user_id}).first()
+    if row.deleted:
+        return "deleted"
+    return "forbidden" if row.present else "missing"
+
+def _clear_alerts(user_id: int) -> None:
+    with session_scope() as session:
+        session.execute(text("DELETE FROM alerts WHERE user_id=:uid"), {"uid": user_id})
+        # Numbering restarts at A1 after a clear, as it did with MAX(user_seq)+1.
+        session.execute(text("DELETE FROM user_alert_counters WHERE user_id=:uid"), {"uid": user_id})
+        session.commit()
+
+def _grant_trial_days(target_tg: str, days: int) -> datetime | None:
+    with session_scope() as s:
+        nxt = next_trial_expiry(s, target_tg, days)
+        if not nxt:
+            return None
+        uid, new_expiry = nxt
+        _insert_trial_row(s, user_id=uid, expiry_iso=new_expiry.isoformat())
+        return new_expiry
 
 # ─────────────────────────── Bot Commands ──────────────────────────
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
     # ensure user row & compute plan (keeps your existing logic)
-    plan = build_plan_info(tg_id, _ADMIN_IDS)
+    plan = await _plan_for(tg_id)
 
     # create/extend trial
-    extra = await _ensure_trial_row(plan.user_id)
+    extra, trial = await asyncio.to_thread(_ensure_trial_row, plan.user_id)
+    invalidate_plan(tg_id)  # a first /start creates the trial the plan was built without
 
     await target_msg(update).reply_text(
         start_text() + extra,
-        reply_markup=main_menu_keyboard(tg_id),
+        reply_markup=main_menu_keyboard(tg_id, trial),
         parse_mode=ParseMode.HTML,
         disable_web_page_preview=True,
     )
 
 async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
-    help_html = (
-        "<b>Help</b>\n\n"
-        "• <code>/price &lt;SYMBOL&gt;</code> → Spot price (auto-detects new Binance USDT listings)\n"
-        "• <code>/setalert &lt;SYMBOL&gt; &lt;op&gt; &lt;value&gt;</code>  e.g. <code>/setalert BTC &gt; 110000</code>\n"
-        "• <code>/myalerts</code> → list your alerts\n"
-        "• <code>/delalert &lt;id&gt;</code>, <code>/clearalerts</code> → Premium\n"
-        "• <code>/whoami</code> → plan info  •  <code>/cancel_autorenew</code>\n"
-        "• <code>/support &lt;message&gt;</code> → contact admins\n\n"
-        "<b>Market Tools</b>\n"
-        "• <code>/feargreed</code> • <code>/funding [SYMBOL]</code> • <code>/topgainers</code> • <code>/toplosers</code>\n"
-        "• <code>/chart &lt;SYMBOL&gt;</code> • <code>/news [N]</code> • <code>/dca &lt;amount&gt; &lt;buys&gt; &lt;symbol&gt;</code>\n"
-        "• <code>/pumplive on|off [threshold%]</code>\n\n"
-        "<b>Alts / Presales</b>\n"
-        "• <code>/alts &lt;SYMBOL&gt;</code> → notes &amp; links only\n"
-        "• <code>/listalts</code> → curated off-Binance/community\n"
-        "• <code>/listpresales</code> → curated presales (very high risk)\n"
-    )
-    for chunk in safe_chunks(help_html):
+    for chunk in _HELP_CHUNKS:
         await target_msg(update).reply_text(
             chunk,
             reply_markup=upgrade_keyboard(tg_id),  # returns None → fine
@@ -346,34 +714,50 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 async def cmd_whoami(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    plan = build_plan_info(str(update.effective_user.id), _ADMIN_IDS)
+    plan = await _plan_for(str(update.effective_user.id))
     await target_msg(update).reply_text(
         f"You are: {'admin' if plan.is_admin else 'user'}\nPremium: {plan.is_premium}\n{plan_status_line(plan)}"
     )
 
 async def cmd_price(update: Update, context: ContextTypes.DEFAULT_TYPE):
     symbol = (context.args[0] if context.args else "BTC").upper()
-    pair = resolve_symbol_auto(symbol)
+    pair = await resolve_symbol_auto(symbol)
     if pair:
-        price = fetch_price_binance(pair)
+        price = await fetch_price_binance_async(pair)
         if price is None:
             await target_msg(update).reply_text("Price fetch failed. Try again later.")
             return
         await target_msg(update).reply_text(f"{pair}: {price:.6f} USDT")
         return
-    info = get_off_binance_info(symbol)
-    if info:
-        lines = [f"ℹ️ <b>{info.get('name', symbol)}</b>\n{info.get('note','')}".strip()]
-        for title, url in info.get("links", []):
-            lines.append(f"• <a href=\"{url}\">{title}</a>")
-        await target_msg(update).reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+    card = get_off_binance_html(symbol)
+    if card:
+        await target_msg(update).reply_text(card, parse_mode=ParseMode.HTML)
         return
     await target_msg(update).reply_text(
         "Unknown symbol. Try BTC, ETH, SOL… or <code>/alts SYMBOL</code>.",
         parse_mode=ParseMode.HTML,
     )
 
-ALERT_RE = re.compile(r"^(?P<sym>[A-Za-z0-9/]+)\s*(?P<op>>|<)\s*(?P<val>[0-9]+(\.[0-9]+)?)$")
+def _parse_alert_expr(args) -> tuple[str, str, float] | None:
+    """Parse "SYMBOL > 123.4" (spaces optional) into (sym, op, value)."""
+    if len(args) == 3 and args[1] in (">", "<"):
+        # Common "/setalert BTC > 110000" shape: no join/re-split needed.
+        sym, op, val = args
+    else:
+        expr = " ".join(args)
+        for op in (">", "<"):
+            sym, sep, val = expr.partition(op)
+            if sep:
+                break
+        else:
+            return None
+        sym, val = sym.strip(), val.strip()
+    if not (sym.isascii() and sym.replace("/", "").isalnum()):
+        return None
+    whole, _, frac = val.partition(".")
+    if not (whole.isascii() and whole.isdigit()) or (frac and not (frac.isascii() and frac.isdigit())) or val.endswith("."):
+        return None
+    return sym, op, float(val)
 
 async def cmd_setalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
@@ -381,71 +765,70 @@ async def cmd_setalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Usage: /setalert <SYMBOL> <op> <value>\nExample: /setalert BTC > 110000"
         )
         return
-    m = ALERT_RE.match(" ".join(context.args))
-    if not m:
+    parsed = _parse_alert_expr(context.args)
+    if not parsed:
         await target_msg(update).reply_text("Format error. Example: /setalert BTC > 110000")
         return
-    sym, op, val = m.group("sym"), m.group("op"), float(m.group("val"))
-    pair = resolve_symbol_auto(sym)
+    sym, op, val = parsed
+    tg_id = str(update.effective_user.id)
+    if not _rate_ok(tg_id):
+        await target_msg(update).reply_text(_RL_DENIED_TEXT)
+        return
+    pair = await resolve_symbol_auto(sym)
     if not pair:
         await target_msg(update).reply_text(
             "Unknown symbol. Try BTC, ETH, SOL … or <code>/alts SYMBOL</code>.",
             parse_mode=ParseMode.HTML,
         )
         return
-    tg_id = str(update.effective_user.id)
-    plan = build_plan_info(tg_id, _ADMIN_IDS)
+    plan = await _plan_for(tg_id)
     allowed, denial, remaining = can_create_alert(plan)
     if not allowed:
         await target_msg(update).reply_text(denial)
         return
     rule = "price_above" if op == ">" else "price_below"
     try:
-        with session_scope() as session:
-            row = session.execute(
-                text(
-                    """
-                INSERT INTO alerts (user_id, symbol, rule, value, cooldown_seconds, user_seq, enabled)
-                VALUES (:uid, :sym, :rule, :val, :cooldown,
-                        (SELECT COALESCE(MAX(user_seq),0)+1 FROM alerts WHERE user_id=:uid),
-                        TRUE)
-                RETURNING id, user_seq
-                """
-                    ),
-                {"uid": plan.user_id, "sym": pair, "rule": rule, "val": val, "cooldown": 900},
-            ).first()
-            user_seq = row.user_seq
+        user_seq = await asyncio.to_thread(_insert_alert, plan.user_id, pair, rule, val)
+        invalidate_plan(tg_id)
         extra = ""  # unlimited during trial/premium/admin
         await target_msg(update).reply_text(f"✅ Alert A{user_seq} set: {pair} {op} {val}{extra}")
     except Exception as e:
         await target_msg(update).reply_text(f"❌ Could not create alert: {e}")
 
-def _alert_buttons(aid: int) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup([[InlineKeyboardButton("🗑️ Delete", callback_data=f"del:{aid}")]])
+_DELETE_LABEL = "🗑️ Delete"
+_MYALERTS_MIN_INTERVAL = 5.0  # seconds between listings per user
+_MYALERTS_LAST: "OrderedDict[str, float]" = OrderedDict()
 
 async def cmd_myalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_id = str(update.effective_user.id)
-    plan = build_plan_info(tg_id, _ADMIN_IDS)
-    with session_scope() as session:
-        rows = session.execute(
-            text(
-                "SELECT id, user_seq, symbol, rule, value, enabled FROM alerts "
-                "WHERE user_id=:uid ORDER BY id DESC LIMIT 20"
-            ),
-            {"uid": plan.user_id},
-        ).all()
+    now = time.time()
+    if now - _MYALERTS_LAST.get(tg_id, 0.0) < _MYALERTS_MIN_INTERVAL:
+        await target_msg(update).reply_text("⏳ Please wait a few seconds before listing alerts again.")
+        return
+    _lru_put(_MYALERTS_LAST, tg_id, now, _USER_CACHE_MAX)
+    if not _rate_ok(tg_id):
+        await target_msg(update).reply_text(_RL_DENIED_TEXT)
+        return
+    plan = await _plan_for(tg_id)
+    rows = await asyncio.to_thread(_fetch_user_alerts, plan.user_id)
     if not rows:
         await target_msg(update).reply_text(f"No alerts in DB.\n{plan_status_line(plan)}")
         return
-    for r in rows:
-        op = op_from_rule(r.rule)
-        await target_msg(update).reply_text(
-            f"A{r.user_seq}  {r.symbol} {op} {r.value}  {'ON' if r.enabled else 'OFF'}",
-            reply_markup=_alert_buttons(r.id),
-        )
+    # One message with a delete-button grid instead of one message per alert.
+    lines = ["🔔 <b>Your alerts</b>"]
+    lines += [
+        f"<b>A{r.user_seq}</b>  <code>{html.escape(r.symbol)}</code> {html.escape(op_from_rule(r.rule))} {r.value}  {'ON' if r.enabled else 'OFF'}"
+        for r in rows
+    ]
+    kb = InlineKeyboardMarkup([[InlineKeyboardButton(f"{_DELETE_LABEL} A{r.user_seq}", callback_data=f"del:{r.id}")] for r in rows])
+    await target_msg(update).reply_text("\n".join(lines), reply_markup=kb, parse_mode=ParseMode.HTML)
 
 async def cmd_delalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    plan = build_plan_info(str(update.effective_user.id), _ADMIN_IDS)
+    tg_id = str(update.effective_user.id)
+    if not _rate_ok(tg_id):
+        await target_msg(update).reply_text(_RL_DENIED_TEXT)
+        return
+    plan = await _plan_for(tg_id)
     if not plan.has_unlimited:
         await target_msg(update).reply_text("This feature is for Premium users. Upgrade to delete alerts.")
         return
@@ -454,25 +837,24 @@ async def cmd_delalert(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     try:
         aid = int(context.args[0])
-    except Exception:
+    except ValueError:
         await target_msg(update).reply_text("Bad id")
         return
-    with session_scope() as session:
-        res = session.execute(
-            text("DELETE FROM alerts WHERE id=:id AND user_id=:uid"),
-            {"id": aid, "uid": plan.user_id},
-        )
-        session.commit()
-    await target_msg(update).reply_text("Deleted." if (res.rowcount or 0) > 0 else "Nothing deleted (check id/ownership).")
+    deleted = await asyncio.to_thread(_delete_alert, plan.user_id, aid)
+    invalidate_plan(plan.telegram_id)
+    await target_msg(update).reply_text("Deleted." if deleted > 0 else "Nothing deleted (check id/ownership).")
 
 async def cmd_clearalerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    plan = build_plan_info(str(update.effective_user.id), _ADMIN_IDS)
+    tg_id = str(update.effective_user.id)
+    if not _rate_ok(tg_id):
+        await target_msg(update).reply_text(_RL_DENIED_TEXT)
+        return
+    plan = await _plan_for(tg_id)
     if not plan.has_unlimited:
         await target_msg(update).reply_text("This feature is for Premium users. Upgrade to clear alerts.")
         return
-    with session_scope() as session:
-        session.execute(text("DELETE FROM alerts WHERE user_id=:uid"), {"uid": plan.user_id})
-        session.commit()
+    await asyncio.to_thread(_clear_alerts, plan.user_id)
+    invalidate_plan(plan.telegram_id)
     await target_msg(update).reply_text("All your alerts were deleted.")
 
 # ─────────────────────────── Alts / Presales ───────────────────────
@@ -483,289 +865,427 @@ async def cmd_alts(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await target_msg(update).reply_text("Usage: /alts <SYMBOL>", parse_mode=ParseMode.HTML)
             return
         sym = (context.args[0] or "").upper().strip()
-        info = get_off_binance_info(sym)
-        if not info:
+        card = get_off_binance_html(sym)
+        if not card:
             await target_msg(update).reply_text("No curated info for that symbol.")
             return
-        lines = [f"ℹ️ <b>{info.get('name', sym)}</b>\n{info.get('note','')}".strip()]
-        for title, url in info.get("links", []):
-            lines.append(f"• <a href=\"{url}\">{title}</a>")
-        await target_msg(update).reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+        await target_msg(update).reply_text(card, parse_mode=ParseMode.HTML)
     except Exception as e:
         await target_msg(update).reply_text(f"Error: {e}")
 
+def _render_symbol_list(title: str, syms, tip: str) -> str | None:
+    if not syms:
+        return None
+    lines = [title]
+    lines += [f"• <code>{s}</code>" for s in syms]
+    lines.append(tip)
+    return "\n".join(lines)
+
+# The curated lists are static module data; render both listings once.
+_LISTALTS_HTML = _render_symbol_list(
+    "🌱 <b>Curated Off-Binance & Community</b>", list_off_binance(),
+    "\nTip: /alts <SYMBOL> for notes & links.",
+)
+_LISTPRESALES_HTML = _render_symbol_list(
+    "🟠 <b>Curated Presales</b>", list_presales(),
+    "\nTip: /alts <SYMBOL> for notes & links. DYOR • High risk.",
+)
+
 async def cmd_listalts(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        syms = list_off_binance()
-        if not syms:
-            await target_msg(update).reply_text("No curated tokens configured yet.")
-            return
-        lines = ["🌱 <b>Curated Off-Binance & Community</b>"]
-        lines += [f"• <code>{s}</code>" for s in syms]
-        lines.append("\nTip: /alts <SYMBOL> for notes & links.")
-        await target_msg(update).reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
-    except Exception as e:
-        await target_msg(update).reply_text(f"Error: {e}")
+    if _LISTALTS_HTML is None:
+        await target_msg(update).reply_text("No curated tokens configured yet.")
+        return
+    await target_msg(update).reply_text(_LISTALTS_HTML, parse_mode=ParseMode.HTML)
 
 async def cmd_listpresales(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        syms = list_presales()
-        if not syms:
-            await target_msg(update).reply_text("No presales listed yet.")
-            return
-        lines = ["🟠 <b>Curated Presales</b>"]
-        lines += [f"• <code>{s}</code>" for s in syms]
-        lines.append("\nTip: /alts <SYMBOL> for notes & links. DYOR • High risk.")
-        await target_msg(update).reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
-    except Exception as e:
-        await target_msg(update).reply_text(f"Error: {e}")
+    if _LISTPRESALES_HTML is None:
+        await target_msg(update).reply_text("No presales listed yet.")
+        return
+    await target_msg(update).reply_text(_LISTPRESALES_HTML, parse_mode=ParseMode.HTML)
 
 # ────────────────────── Callback buttons (inline) ───────────────────
 
+# Each handler gets (update, context, query, tg_id, rest) where `rest` is
+# callback_data after the matched prefix; on_callback dispatches with one
+# dict lookup for exact keys and a short prefix scan otherwise.
+
+async def _cb_help(update, context, query, tg_id, rest):
+    await cmd_help(update, context)
+
+async def _cb_myalerts(update, context, query, tg_id, rest):
+    await cmd_myalerts(update, context)
+
+async def _cb_price(update, context, query, tg_id, sym):
+    pair = await resolve_symbol_auto(sym)
+    price = await fetch_price_binance_async(pair) if pair else None
+    await query.message.reply_text("Price fetch failed." if price is None else f"{pair}: {price:.6f} USDT")
+
+async def _cb_setalerthelp(update, context, query, tg_id, rest):
+    await query.message.reply_text("Examples:\n• /setalert BTC > 110000\n• /setalert ETH < 2000")
+
+async def _cb_support(update, context, query, tg_id, rest):
+    await query.message.reply_text("Send /support <message>", reply_markup=upgrade_keyboard(tg_id))
+
+async def _cb_request_days(update, context, query, tg_id, rest):
+    """Request extra days → notify admins with approve/decline buttons."""
+    kb = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("✅ Approve 7d", callback_data=f"admin:grant:{tg_id}:7"),
+            InlineKeyboardButton("✅ Approve 15d", callback_data=f"admin:grant:{tg_id}:15"),
+            InlineKeyboardButton("✅ Approve 30d", callback_data=f"admin:grant:{tg_id}:30"),
+        ],
+        [InlineKeyboardButton("❌ Decline", callback_data=f"admin:decline:{tg_id}")]
+    ])
+    # All admins and the user's confirmation in one concurrent round;
+    # one unreachable admin must not block or fail the others.
+    note = f"📩 <b>Request for extra trial days</b>\nFrom user: <code>{tg_id}</code>"
+    await asyncio.gather(
+        *(context.bot.send_message(chat_id=aid, text=note, parse_mode=ParseMode.HTML, reply_markup=kb)
+          for aid in _ADMIN_CHAT_IDS),
+        query.message.reply_text("✅ Sent request to admin. You’ll be notified here."),
+        return_exceptions=True,
+    )
+
+async def _cb_admin(update, context, query, tg_id, rest):
+    """Admin approval / decline: admin:<action>:<target_tg>[:<days>]."""
+    parts = rest.split(":")
+    action = parts[0]
+    target_tg = parts[1] if len(parts) > 1 else None
+    if tg_id not in _ADMIN_IDS:
+        await query.answer("Admin only"); return
+    if action == "grant":
+        try:
+            days = int(parts[2]) if len(parts) > 2 else 7
+        except ValueError:
+            await query.answer("Bad callback."); return
+        # Insert trial
+        new_expiry = await asyncio.to_thread(_grant_trial_days, target_tg, days)
+        invalidate_plan(target_tg)
+        await query.edit_message_text(f"✅ Approved {days}d for {target_tg}.")
+        try:
+            await context.bot.send_message(
+                chat_id=int(target_tg),
+                text=f"🎉 Admin approved extra {days} day(s). Enjoy!\nNew expiry (UTC): {new_expiry.date().isoformat() if new_expiry else 'updated'}"
+            )
+        except Exception:
+            pass
+        return
+    if action == "decline":
+        await query.edit_message_text(f"❌ Declined request for {target_tg}.")
+        try:
+            await context.bot.send_message(chat_id=int(target_tg), text="😕 Admin declined your request for extra days.")
+        except Exception:
+            pass
+
+async def _cb_delete(update, context, query, tg_id, rest):
+    """Delete button from /myalerts: del:<alert id>."""
+    try:
+        aid = int(rest)
+    except ValueError:
+        await query.edit_message_text("Bad id."); return
+    if not _rate_ok(tg_id, cost=2):
+        await query.message.reply_text(_RL_DENIED_TEXT); return
+    # The plan is only needed for deletion, so it is loaded here rather than
+    # on every button press.
+    plan = await _plan_for(tg_id)
+    outcome = await asyncio.to_thread(_delete_own_alert, plan.user_id, aid)
+    invalidate_plan(tg_id)
+    if outcome == "missing":
+        await query.edit_message_text("Alert not found."); return
+    if outcome == "forbidden":
+        await query.edit_message_text("You can delete only your own alerts."); return
+    await query.edit_message_text("✅ Deleted alert.")
+
+async def _cb_ack(update, context, query, tg_id, rest):
+    """Buttons under a fired alert: ack:<keep|del>:<alert id>."""
+    action, sep, aid_str = rest.partition(":")
+    if not sep or ":" in aid_str:
+        await query.answer("Bad callback."); return
+    try:
+        aid = int(aid_str)
+    except ValueError:
+        await query.answer("Bad id."); return
+    if action == "keep":
+        try:
+            await query.edit_message_reply_markup(reply_markup=None)
+            await query.answer("Kept 👍")
+        except Exception:
+            await query.answer("Kept.")
+        return
+    if action == "del":
+        if not _rate_ok(tg_id, cost=2):
+            await query.message.reply_text(_RL_DENIED_TEXT); return
+        plan = await _plan_for(tg_id)
+        outcome = await asyncio.to_thread(_delete_own_alert, plan.user_id, aid)
+        invalidate_plan(tg_id)
+        if outcome == "missing":
+            await query.edit_message_text("Alert not found."); return
+        if outcome == "forbidden":
+            await query.edit_message_text("You can delete only your own alerts."); return
+        try:
+            await query.edit_message_text("✅ Alert deleted.")
+        except Exception:
+            await query.answer("Deleted.")
+
+_CB_EXACT = {
+    "go:help": _cb_help,
+    "go:myalerts": _cb_myalerts,
+    "go:setalerthelp": _cb_setalerthelp,
+    "go:support": _cb_support,
+    "req:days": _cb_request_days,
+}
+_CB_PREFIX = (
+    ("del:", _cb_delete),
+    ("ack:", _cb_ack),
+    ("go:price:", _cb_price),
+    ("admin:", _cb_admin),
+)
+
 async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer("Loading...", show_alert=False)
     data = (query.data or "").strip()
     tg_id = str(query.from_user.id)
-    plan = build_plan_info(tg_id, _ADMIN_IDS)
-
-    # Menu navigation
-    if data == "go:help":
-        await cmd_help(update, context); return
-    if data == "go:myalerts":
-        await cmd_myalerts(update, context); return
-    if data.startswith("go:price:"):
-        sym = data.split(":", 2)[2]
-        pair = resolve_symbol_auto(sym)
-        price = fetch_price_binance(pair) if pair else None
-        await query.message.reply_text("Price fetch failed." if price is None else f"{pair}: {price:.6f} USDT")
-        return
-    if data == "go:setalerthelp":
-        await query.message.reply_text("Examples:\n• /setalert BTC > 110000\n• /setalert ETH < 2000")
-        return
-    if data == "go:support":
-        await query.message.reply_text("Send /support <message>", reply_markup=upgrade_keyboard(tg_id))
+    handler = _CB_EXACT.get(data)
+    if handler is not None:
+        await handler(update, context, query, tg_id, "")
         return
+    for prefix, handler in _CB_PREFIX:
+        if data.startswith(prefix):
+            await handler(update, context, query, tg_id, data[len(prefix):])
+            return
 
-    # Request extra days → notify admins with approve/decline buttons
-    if data == "req:days":
-        kb = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton("✅ Approve 7d", callback_data=f"admin:grant:{tg_id}:7"),
-                InlineKeyboardButton("✅ Approve 15d", callback_data=f"admin:grant:{tg_id}:15"),
-                InlineKeyboardButton("✅ Approve 30d", callback_data=f"admin:grant:{tg_id}:30"),
-            ],
-            [InlineKeyboardButton("❌ Decline", callback_data=f"admin:decline:{tg_id}")]
-        ])
-        for aid in _ADMIN_IDS:
-            try:
-                await context.bot.send_message(
-                    chat_id=int(aid),
-                    text=f"📩 <b>Request for extra trial days</b>\nFrom user: <code>{tg_id}</code>",
-                    parse_mode=ParseMode.HTML,
-                    reply_markup=kb
-                )
-            except Exception:
-                pass
-        await query.message.reply_text("✅ Sent request to admin. You’ll be notified here.")
-        return
+# ─────────────────────── Bot lifecycle hooks ───────────────────────
 
-    # Admin approval / decline via callbacks
-    if data.startswith("admin:"):
-        parts = data.split(":")
-        action = parts[1]
-        target_tg = parts[2] if len(parts) > 2 else None
-        if str(query.from_user.id) not in _ADMIN_IDS:
-            await query.answer("Admin only"); return
-        if action == "grant":
-            days = int(parts[3]) if len(parts) > 3 else 7
-            # Insert trial
-            with session_scope() as s:
-                u = s.execute(text("SELECT id FROM users WHERE telegram_id=:tg"), {"tg": target_tg}).mappings().first()
-                if u:
-                    uid = int(u["id"])
-                    now = datetime.utcnow()
-                    t = s.execute(text(
-                        "SELECT provider_sub_id FROM subscriptions WHERE user_id=:uid AND provider='trial' ORDER BY created_at DESC LIMIT 1"
-                    ), {"uid": uid}).mappings().first()
-                    base = now
-                    if t and t.get("provider_sub_id"):
-                        try:
-                            ex = datetime.fromisoformat(t.get("provider_sub_id"))
-                            ex = ex.replace(tzinfo=None)
-                            if ex > now: base = ex
-                        except Exception:
-                            pass
-                    new_expiry = base + timedelta(days=days)
-                    _insert_trial_row(s, user_id=uid, expiry_iso=new_expiry.isoformat())
-                else:
-                    new_expiry = None
-            await query.edit_message_text(f"✅ Approved {days}d for {target_tg}.")
-            try:
-                await context.bot.send_message(
-                    chat_id=int(target_tg),
-                    text=f"🎉 Admin approved extra {days} day(s). Enjoy!\nNew expiry (UTC): {new_expiry.date().isoformat() if new_expiry else 'updated'}"
-                )
-            except Exception:
-                pass
-            return
-        if action == "decline":
-            await query.edit_message_text(f"❌ Declined request for {target_tg}.")
-            try:
-                await context.bot.send_message(chat_id=int(target_tg), text="😕 Admin declined your request for extra days.")
-            except Exception:
-                pass
-            return
+_BACKGROUND_TASKS: list[asyncio.Task] = []
 
-    # Alert deletion ACKs
-    if data.startswith("del:"):
-        try:
-            aid = int(data.split(":", 1)[1])
-        except Exception:
-            await query.edit_message_text("Bad id."); return
-        with session_scope() as s:
-            owner = s.execute(text("SELECT user_id FROM alerts WHERE id=:id"), {"id": aid}).first()
-            if not owner:
-                await query.edit_message_text("Alert not found."); return
-            if owner.user_id != plan.user_id:
-                await query.edit_message_text("You can delete only your own alerts."); return
-            s.execute(text("DELETE FROM alerts WHERE id=:id AND user_id=:uid"),
-                      {"id": aid, "uid": plan.user_id})
-            s.commit()
-        await query.edit_message_text("✅ Deleted alert.")
-        return
+async def _on_bot_init(app: Application) -> None:
+    loop = asyncio.get_running_loop()
+    _BACKGROUND_TASKS.append(loop.create_task(bot_heartbeat_loop(app.bot)))
+    _BACKGROUND_TASKS.append(loop.create_task(alerts_loop()))
+    _BACKGROUND_TASKS.append(loop.create_task(cache_sweep_loop()))
+    _BACKGROUND_TASKS.append(loop.create_task(daily_news_loop()))
 
-    if data.startswith("ack:"):
-        parts = data.split(":")
-        if len(parts) != 3:
-            await query.answer("Bad callback."); return
-        action, aid_str = parts[1], parts[2]
-        try:
-            aid = int(aid_str)
-        except Exception:
-            await query.answer("Bad id."); return
-        if action == "keep":
-            try:
-                await query.edit_message_reply_markup(reply_markup=None)
-                await query.answer("Kept 👍")
-            except Exception:
-                await query.answer("Kept.")
-            return
-        if action == "del":
-            with session_scope() as s:
-                owner = s.execute(text("SELECT user_id FROM alerts WHERE id=:id"), {"id": aid}).first()
-                if not owner:
-                    await query.edit_message_text("Alert not found."); return
-                if owner.user_id != plan.user_id:
-                    await query.edit_message_text("You can delete only your own alerts."); return
-                s.execute(text("DELETE FROM alerts WHERE id=:id AND user_id=:uid"),
-                          {"id": aid, "uid": plan.user_id})
-                s.commit()
-            try:
-                await query.edit_message_text("✅ Alert deleted.")
-            except Exception:
-                await query.answer("Deleted.")
-            return
+async def _on_bot_shutdown(app: Application) -> None:
+    tasks = list(_BACKGROUND_TASKS)
+    _BACKGROUND_TASKS.clear()
+    for task in tasks:
+        task.cancel()
+    # Let the loops unwind (finally blocks, open sessions) before the
+    # application and HTTP client are torn down underneath them.
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 # ─────────────────────────── Worker loop ───────────────────────────
 
-def alerts_loop():
-    global _ALERTS_LAST_OK_AT, _ALERTS_LAST_RESULT
+ALERTS_CHANNEL = "alerts_changed"
+
+def _open_alerts_listener():
+    """Dedicated autocommit psycopg2 connection LISTENing on ALERTS_CHANNEL."""
+    raw = lock_engine.raw_connection()
+    pg = raw.driver_connection
+    pg.autocommit = True
+    with pg.cursor() as cur:
+        cur.execute(f"LISTEN {ALERTS_CHANNEL}")
+    return raw, pg
+
+def _run_alert_cycle_once() -> dict:
+    with session_scope() as s:
+        return run_alert_cycle(s)
+
+async def alerts_loop():
+    """Alert evaluation on the bot's event loop; each cycle runs in a worker thread."""
+    global _ALERTSOK_BODY
     if not RUN_ALERTS:
         print({"msg": "alerts_disabled_env"}); return
-    lock_conn = engine.connect()
-    got = lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": ALERTS_LOCK_ID}).scalar()
-    if not got:
-        print({"msg": "alerts_lock_skipped"}); lock_conn.close(); return
-    print({"msg": "alerts_loop_start", "interval": INTERVAL_SECONDS}); init_db()
+    lock_conn = await asyncio.to_thread(_acquire_advisory_lock, ALERTS_LOCK_ID)
+    if lock_conn is None:
+        print({"msg": "alerts_lock_skipped"}); return
+    print({"msg": "alerts_loop_start", "interval": INTERVAL_SECONDS})
+    # Wake early when /setalert NOTIFYs; INTERVAL_SECONDS remains the price
+    # polling period (thresholds can only cross as prices move).
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    listener = None
+    try:
+        raw, pg = await asyncio.to_thread(_open_alerts_listener)
+        fd = pg.fileno()
+
+        def _on_notify():
+            nonlocal listener
+            try:
+                pg.poll()
+            except Exception as e:
+                # Listener connection dropped: stop watching the dead fd and
+                # carry on with plain timed ticks.
+                print({"msg": "alerts_listen_lost", "error": str(e)})
+                loop.remove_reader(fd)
+                listener = None
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+                return
+            pg.notifies.clear()
+            wake.set()
+
+        loop.add_reader(fd, _on_notify)
+        listener = (raw, pg)
+    except Exception as e:
+        print({"msg": "alerts_listen_error", "error": str(e)})
     try:
         while True:
-            ts = datetime.utcnow().isoformat()
+            # Fixed-rate ticks: the next deadline counts from the start of this
+            # cycle, so a slow cycle does not push every later one back.
+            started = loop.time()
+            deadline = started + INTERVAL_SECONDS
+            ts = _utcnow().isoformat()
             try:
-                with session_scope() as s:
-                    counters = run_alert_cycle(s)
-                _ALERTS_LAST_RESULT = {"ts": ts, **counters}
-                _ALERTS_LAST_OK_AT = datetime.utcnow()
-                print({"msg": "alert_cycle", **_ALERTS_LAST_RESULT})
+                counters = await asyncio.to_thread(_run_alert_cycle_once)
+                result = {"ts": ts, **counters}
+                _ALERTSOK_BODY = _alertsok_body(_utc_iso_z(), result)
+                print({"msg": "alert_cycle", **result})
             except Exception as e:
                 print({"msg": "alert_cycle_error", "ts": ts, "error": str(e)})
-            time.sleep(INTERVAL_SECONDS)
+            # NOTIFYs arriving before the minimum gap just leave `wake` set, so
+            # they are all served by the first cycle after it.
+            await asyncio.sleep(max(0.0, started + ALERTS_MIN_GAP_SECONDS - loop.time()))
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
     finally:
+        if listener is not None:
+            loop.remove_reader(listener[1].fileno())
+            try:
+                listener[0].close()
+            except Exception:
+                pass
         try:
             lock_conn.close()
         except Exception:
             pass
 
-def delete_webhook_if_any():
-    try:
-        r = requests.get(f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook", timeout=10)
-        print({"msg": "delete_webhook", "status": r.status_code, "body": r.text[:160]})
-    except Exception as e:
-        print({"msg": "delete_webhook_exception", "error": str(e)})
-
 # ─────────────────────────── Run bot (polling) ─────────────────────
 
-def run_bot():
+def build_bot_app() -> Application:
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        # HTTP/2 multiplexes concurrent replies over one TLS session instead of
+        # a handshake per pooled connection during bursts.
+        .request(HTTPXRequest(connection_pool_size=64, read_timeout=40, connect_timeout=15,
+                              pool_timeout=5, http_version="2"))
+    )
+    if BOT_WEBHOOK_MODE:
+        # Updates arrive on /tg/<secret>; no Updater, no getUpdates client.
+        builder = builder.updater(None)
+    else:
+        # Separate pools: the long-poll getUpdates call holds its connection
+        # for the whole poll, so it gets its own and can never starve replies.
+        builder = builder.get_updates_request(HTTPXRequest(connection_pool_size=1, read_timeout=40, connect_timeout=15))
+    app = (
+        builder
+        # Pace every outbound Bot API call under Telegram's ~30 msg/s bot-wide
+        # limit, plus the default 20/min per group chat. Private chats have no
+        # per-chat throttle here; a 429 there is retried after Telegram's
+        # retry_after (up to max_retries).
+        .rate_limiter(AIORateLimiter(overall_max_rate=28, max_retries=2))
+        # A slow Binance lookup for one user must not hold up everyone else's
+        # updates. Concurrent /setalert calls are safe: _insert_alert retries
+        # on the (user_id, user_seq) unique index.
+        .concurrent_updates(True)
+        .build()
+    )
+
+    # Core commands
+    app.add_handler(CommandHandler("start", cmd_start))
+    app.add_handler(CommandHandler("help", cmd_help, block=False))
+    app.add_handler(CommandHandler("whoami", cmd_whoami, block=False))
+    app.add_handler(CommandHandler("price", cmd_price, block=False))
+    app.add_handler(CommandHandler("alts", cmd_alts, block=False))
+    app.add_handler(CommandHandler("listalts", cmd_listalts, block=False))
+    app.add_handler(CommandHandler("listpresales", cmd_listpresales, block=False))
+    app.add_handler(CommandHandler("setalert", cmd_setalert))
+    app.add_handler(CommandHandler("myalerts", cmd_myalerts, block=False))
+    app.add_handler(CommandHandler("delalert", cmd_delalert))
+    app.add_handler(CommandHandler("clearalerts", cmd_clearalerts))
+
+    # Extras (funding/topgainers/chart/news/dca/pumplive etc.)
+    register_extra_handlers(app)
+
+    # Admin module
+    register_admin_handlers(app, _ADMIN_IDS)
+
+    # Callback queries (inline buttons)
+    app.add_handler(CallbackQueryHandler(on_callback))
+    return app
+
+async def run_bot(stop: asyncio.Event) -> bool:
+    """Run the bot on the current loop until `stop` is set, by long
+    polling or, with BOT_MODE=webhook, via the /tg/<secret> route.
+    Returns False without starting when the bot is disabled or another
+    instance holds the bot lock."""
     if not RUN_BOT:
-        print({"msg": "bot_disabled_env"}); return
+        print({"msg": "bot_disabled_env"}); return False
 
-    lock_conn = engine.connect()
-    got = lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": BOT_LOCK_ID}).scalar()
-    if not got:
-        print({"msg": "bot_lock_skipped"}); lock_conn.close(); return
+    lock_conn = await asyncio.to_thread(_acquire_advisory_lock, BOT_LOCK_ID)
+    if lock_conn is None:
+        print({"msg": "bot_lock_skipped"}); return False
     try:
-        try:
-            delete_webhook_if_any()
-        except Exception:
-            pass
-
-        app = (
-            Application.builder()
-            .token(BOT_TOKEN)
-            .read_timeout(40)
-            .connect_timeout(15)
-            .build()
-        )
-
-        # Core commands
-        app.add_handler(CommandHandler("start", cmd_start))
-        app.add_handler(CommandHandler("help", cmd_help))
-        app.add_handler(CommandHandler("whoami", cmd_whoami))
-        app.add_handler(CommandHandler("price", cmd_price))
-        app.add_handler(CommandHandler("alts", cmd_alts))
-        app.add_handler(CommandHandler("listalts", cmd_listalts))
-        app.add_handler(CommandHandler("listpresales", cmd_listpresales))
-        app.add_handler(CommandHandler("setalert", cmd_setalert))
-        app.add_handler(CommandHandler("myalerts", cmd_myalerts))
-        app.add_handler(CommandHandler("delalert", cmd_delalert))
-        app.add_handler(CommandHandler("clearalerts", cmd_clearalerts))
-
-        # Extras (funding/topgainers/chart/news/dca/pumplive etc.)
-        register_extra_handlers(app)
-
-        # Admin module
-        register_admin_handlers(app, _ADMIN_IDS)
-
-        # Callback queries (inline buttons)
-        app.add_handler(CallbackQueryHandler(on_callback))
-
-        print({"msg": "bot_start"})
+        # No explicit deleteWebhook: start_polling's bootstrap already drops
+        # any webhook before the first getUpdates.
+        app = build_bot_app()
+        print({"msg": "bot_start", "mode": "webhook" if BOT_WEBHOOK_MODE else "polling"})
 
         backoff = 5
         while True:
             try:
-                app.run_polling(drop_pending_updates=True, allowed_updates=Update.ALL_TYPES)
+                await app.initialize()
+                if BOT_WEBHOOK_MODE:
+                    await app.bot.set_webhook(
+                        url=f"{WEB_URL.rstrip('/')}/tg/{TG_WEBHOOK_SECRET}",
+                        allowed_updates=Update.ALL_TYPES,
+                        drop_pending_updates=True,
+                        secret_token=TG_WEBHOOK_SECRET,
+                    )
+                else:
+                    # 30s long poll: an idle bot makes ~2 getUpdates calls a
+                    # minute instead of 6; the getUpdates client's 40s read
+                    # timeout stays above it.
+                    await app.updater.start_polling(
+                        timeout=30,
+                        poll_interval=0.0,
+                        drop_pending_updates=True,
+                        allowed_updates=Update.ALL_TYPES,
+                    )
                 break
             except Conflict as e:
                 print({"msg": "bot_conflict_retry", "error": str(e)})
-                time.sleep(5)
+                await asyncio.sleep(5)
             except TgTimedOut as e:
                 print({"msg": "bot_timeout_retry", "error": str(e), "sleep": backoff})
-                time.sleep(backoff)
+                await asyncio.sleep(backoff)
                 backoff = min(backoff * 2, 60)
             except Exception as e:
                 print({"msg": "bot_generic_retry", "error": str(e), "sleep": 10})
-                time.sleep(10)
+                await asyncio.sleep(10)
+
+        await _on_bot_init(app)
+        await app.start()
+        health_app.state.bot_app = app
+        try:
+            await stop.wait()
+        finally:
+            # The webhook is left registered on shutdown: during a redeploy the
+            # next instance re-sets it, and Telegram holds updates meanwhile.
+            health_app.state.bot_app = None
+            if app.updater is not None and app.updater.running:
+                await app.updater.stop()
+            await app.stop()
+            await _on_bot_shutdown(app)
+            await app.shutdown()
+        return True
     finally:
         try:
             lock_conn.close()
@@ -774,26 +1294,25 @@ def run_bot():
 
 # ─────────────────────────── Entry point ───────────────────────────
 
-def main():
-    init_db()
-    init_extras()
-
-    # Health server & heartbeat
+async def _serve() -> None:
+    """uvicorn, the bot and its background tasks share this one event loop;
+    the bot is started and stopped by the app lifespan."""
     port = int(os.getenv("PORT", "10000"))
-    threading.Thread(
-        target=lambda: uvicorn.run(health_app, host="0.0.0.0", port=port, log_level="info"),
-        daemon=True
-    ).start()
-    threading.Thread(target=bot_heartbeat_loop, daemon=True).start()
-
-    # Alerts worker
-    threading.Thread(target=alerts_loop, daemon=True).start()
+    # http="auto" picks httptools when installed. loop= is not passed: serve()
+    # runs on the loop main() created, which is already uvloop when available.
+    server = uvicorn.Server(uvicorn.Config(health_app, host="0.0.0.0", port=port, log_level="info", http="auto"))
+    # uvicorn owns SIGINT/SIGTERM; when it exits, the lifespan stops the bot.
+    health_app.state.server = server
+    await server.serve()
 
-    # Pump watcher (extra)
-    start_pump_watcher()
-
-    # Bot (polling)
-    run_bot()
+def main():
+    # Health server + bot; schema setup, the bot, heartbeat, alerts and the
+    # daily news digest all run from the app lifespan on this loop
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(_serve())
+    if _BOT_FAILED:
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
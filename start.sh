@@ -5,4 +5,7 @@ python -m pip install --upgrade pip
 pip install -r requirements.txt
 
 export PYTHONUNBUFFERED=1
-uvicorn server_combined:health_app --host 0.0.0.0 --port "${PORT:-8080}"
+# uvloop + httptools are pinned in requirements.txt; keep a single worker:
+# the bot, its advisory lock and the in-process caches are per process.
+uvicorn server_combined:health_app --host 0.0.0.0 --port "${PORT:-8080}" \
+  --loop uvloop --http httptools --workers 1
@@ -11,7 +11,7 @@ from db import session_scope
 DEFAULT_FREE_LIMIT = 10  # free uses per command
 
 
-@dataclass
+@dataclass(slots=True)
 class UsageResult:
     allowed: bool
     used: int
@@ -19,8 +19,23 @@ class UsageResult:
     limit: int
 
 
+_SCHEMA_READY = False
+
+_INCREMENT_SQL = text(
+    """
+    INSERT INTO user_usage (user_id, command, cnt) VALUES (:uid, :cmd, 1)
+    ON CONFLICT (user_id, command)
+    DO UPDATE SET cnt = user_usage.cnt + 1, updated_at = NOW()
+    RETURNING cnt
+    """
+)
+
+
 def ensure_usage_schema() -> None:
-    """Create the user_usage table if it doesn't exist."""
+    """Create the user_usage table if it doesn't exist (once per process)."""
+    global _SCHEMA_READY
+    if _SCHEMA_READY:
+        return
     with session_scope() as s:
         s.execute(text(
             """
@@ -34,6 +49,7 @@ def ensure_usage_schema() -> None:
             """
         ))
         s.commit()
+    _SCHEMA_READY = True
 
 
 def increment_and_check(user_id: int, command: str, is_premium: bool, limit: int = DEFAULT_FREE_LIMIT) -> UsageResult:
@@ -50,22 +66,8 @@ def increment_and_check(user_id: int, command: str, is_premium: bool, limit: int
     cmd = (command or "").strip().lower()
 
     with session_scope() as s:
-        # Upsert-like increment
-        row = s.execute(text(
-            "SELECT cnt FROM user_usage WHERE user_id=:uid AND command=:cmd"
-        ), {"uid": user_id, "cmd": cmd}).first()
-
-        if row:
-            new_cnt = int(row.cnt) + 1
-            s.execute(text(
-                "UPDATE user_usage SET cnt=:c, updated_at=NOW() WHERE user_id=:uid AND command=:cmd"
-            ), {"c": new_cnt, "uid": user_id, "cmd": cmd})
-        else:
-            new_cnt = 1
-            s.execute(text(
-                "INSERT INTO user_usage (user_id, command, cnt) VALUES (:uid, :cmd, 1)"
-            ), {"uid": user_id, "cmd": cmd})
-        s.commit()
+        # Atomic increment: one round trip, no read-modify-write race
+        new_cnt = int(s.execute(_INCREMENT_SQL, {"uid": user_id, "cmd": cmd}).scalar())
 
     allowed = new_cnt <= int(limit)
     remaining = max(0, int(limit) - new_cnt)
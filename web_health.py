@@ -1,12 +1,15 @@
 # web_health.py
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+_ROOT_RESPONSE = ORJSONResponse({"ok": True, "service": "crypto-alerts-bot"})
+_HEALTH_RESPONSE = ORJSONResponse({"status": "ok"})
 
 @app.get("/")
-def root():
-    return {"ok": True, "service": "crypto-alerts-bot"}
+async def root():
+    return _ROOT_RESPONSE
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    return _HEALTH_RESPONSE
@@ -1,13 +1,12 @@
 # worker_extra.py
 # Background helpers for optional features.
-# - start_pump_watcher(): keeps name for backward-compatibility AND starts the daily news scheduler
-# - Daily News Scheduler: sends a digest every day at 09:00 UTC to opted-in users
+# - daily_news_loop(): sends a digest every day at 09:00 UTC to opted-in users
 #
-# Single-service friendly: runs lightweight loops in daemon threads.
+# Single-service friendly: runs as an asyncio task on the bot's event loop;
+# the blocking DB/HTTP work of each tick goes through asyncio.to_thread.
 
 import os
-import time
-import threading
+import asyncio
 from datetime import datetime, timezone, date
 
 import requests
@@ -19,17 +18,18 @@ from plans import build_plan_info
 from features_market import get_news_headlines
 
 BOT_TOKEN = (os.getenv("BOT_TOKEN") or "").strip()
+_URL_SEND_MESSAGE = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
 DAILYNEWS_HOUR_UTC = int(os.getenv("DAILYNEWS_HOUR_UTC", "9"))
 DAILYNEWS_MAX_FREE = 1
 DAILYNEWS_MAX_PREMIUM = min(30, int(os.getenv("DAILYNEWS_MAX_PREMIUM", "10")))
 
-_ADMIN_IDS = {s.strip() for s in (os.getenv("ADMIN_TELEGRAM_IDS") or "").split(",") if s.strip()}
+_ADMIN_IDS = frozenset(s.strip() for s in (os.getenv("ADMIN_TELEGRAM_IDS") or "").split(",") if s.strip())
 
 def _send_message(chat_id: str, text: str, disable_preview: bool = False) -> bool:
     if not BOT_TOKEN:
         return False
     try:
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+        url = _URL_SEND_MESSAGE
         r = requests.post(url, json={
             "chat_id": chat_id,
             "text": text,
@@ -76,57 +76,32 @@ def _build_digest_for(telegram_id: str, user_id: int) -> str:
         lines.append(f"• <a href=\"{link}\">{safe_title}</a>")
     return "\n".join(lines)
 
-def _daily_news_loop():
+def _daily_news_tick(last_run_day: str | None) -> str | None:
+    """One scheduler check; returns the day the digest last went out."""
+    now = datetime.now(timezone.utc)
+    if now.hour != DAILYNEWS_HOUR_UTC:
+        return last_run_day
+    today_str = now.date().isoformat()
+    if last_run_day == today_str:
+        return last_run_day
+    # time window 09:00 UTC (single shot per day)
+    for tg_id, uid in _list_dailynews_optins():
+        if not _should_send_today(uid):
+            continue
+        msg = _build_digest_for(tg_id, uid)
+        if not msg:
+            continue
+        ok = _send_message(tg_id, msg, disable_preview=False)
+        if ok:
+            _mark_sent_today(uid)
+    return today_str
+
+async def daily_news_loop():
     print({"msg": "daily_news_scheduler_started", "hour_utc": DAILYNEWS_HOUR_UTC})
     last_run_day = None  # extra guard to avoid repeating inside same day if process keeps running
-
     while True:
         try:
-            now = datetime.now(timezone.utc)
-            if now.hour == DAILYNEWS_HOUR_UTC:
-                today_str = now.date().isoformat()
-                if last_run_day != today_str:
-                    # time window 09:00 UTC (single shot per day)
-                    optins = _list_dailynews_optins()
-                    if optins:
-                        for tg_id, uid in optins:
-                            if not _should_send_today(uid):
-                                continue
-                            msg = _build_digest_for(tg_id, uid)
-                            if not msg:
-                                continue
-                            ok = _send_message(tg_id, msg, disable_preview=False)
-                            if ok:
-                                _mark_sent_today(uid)
-                    last_run_day = today_str
-            time.sleep(30)  # check twice per minute
+            last_run_day = await asyncio.to_thread(_daily_news_tick, last_run_day)
         except Exception as e:
             print({"msg": "daily_news_scheduler_error", "error": str(e)})
-            time.sleep(30)
-
-# ---- Pump watcher (minimal placeholder for compatibility) ----
-def _pump_watcher_loop():
-    # Minimal safe loop — extend with real-time pump logic if needed.
-    print({"msg": "pump_watcher_started"})
-    while True:
-        try:
-            # Placeholder sleep to keep thread alive
-            time.sleep(15)
-        except Exception as e:
-            print({"msg": "pump_watcher_error", "error": str(e)})
-            time.sleep(15)
-
-def start_pump_watcher():
-    """
-    Backward-compatible entry point.
-    Starts both:
-      - pump watcher loop (lightweight placeholder)
-      - daily news scheduler loop (09:00 UTC)
-    """
-    t1 = threading.Thread(target=_pump_watcher_loop, daemon=True)
-    t1.start()
-
-    t2 = threading.Thread(target=_daily_news_loop, daemon=True)
-    t2.start()
-
-    print({"msg": "worker_extra_threads_started"})
+        await asyncio.sleep(30)  # check twice per minute
@@ -6,13 +6,14 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
-import requests
 from sqlalchemy import text
 
 from db import session_scope
+from http_client import SESSION, async_client
 from feedback_followup import record_alert_trigger
 
 BOT_TOKEN = (os.getenv("BOT_TOKEN") or "").strip()
+_URL_SEND_MESSAGE = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
 # How often the server's alerts loop calls this (seconds) comes from the caller,
 # but we also guard with per-alert cooldowns in DB.
 DEFAULT_COOLDOWN = int(os.getenv("ALERT_DEFAULT_COOLDOWN_SECONDS", "900"))  # 15m fallback
@@ -40,7 +41,62 @@ def fetch_price_binance(symbol_pair: str) -> float | None:
     Lightweight spot price from Binance public API.
     """
     try:
-        r = requests.get(
+        r = SESSION.get(
+            "https://api.binance.com/api/v3/ticker/price",
+            params={"symbol": symbol_pair},
+            timeout=10,
+        )
+        if r.status_code == 200:
+            j = r.json()
+            return float(j.get("price"))
+    except Exception:
+        return None
+    return None
+
+
+# Last all-symbols ticker snapshot: (fetched_at, {pair: price}). One GET covers
+# every pair an alert cycle needs; /price reuses it while it is fresh.
+PRICE_SNAPSHOT_TTL = float(os.getenv("PRICE_SNAPSHOT_TTL_SECONDS", "5"))
+_PRICE_SNAPSHOT: tuple[float, Dict[str, float]] = (0.0, {})
+
+
+def fetch_all_prices_binance() -> Dict[str, float]:
+    """
+    All Binance spot prices in one request, cached for PRICE_SNAPSHOT_TTL.
+    Returns an empty dict on failure; callers fall back to per-symbol fetches.
+    """
+    global _PRICE_SNAPSHOT
+    fetched_at, prices = _PRICE_SNAPSHOT
+    if time.time() - fetched_at < PRICE_SNAPSHOT_TTL:
+        return prices
+    try:
+        r = SESSION.get("https://api.binance.com/api/v3/ticker/price", timeout=15)
+        if r.status_code != 200:
+            return {}
+        prices = {t["symbol"]: float(t["price"]) for t in r.json()}
+    except Exception:
+        return {}
+    _PRICE_SNAPSHOT = (time.time(), prices)
+    return prices
+
+
+def snapshot_price(symbol_pair: str) -> float | None:
+    """Price from the snapshot if it is still fresh, without any network call."""
+    fetched_at, prices = _PRICE_SNAPSHOT
+    if time.time() - fetched_at < PRICE_SNAPSHOT_TTL:
+        return prices.get(symbol_pair)
+    return None
+
+
+async def fetch_price_binance_async(symbol_pair: str) -> float | None:
+    """
+    Same as fetch_price_binance, for coroutines on the bot loop.
+    """
+    cached = snapshot_price(symbol_pair)
+    if cached is not None:
+        return cached
+    try:
+        r = await async_client().get(
             "https://api.binance.com/api/v3/ticker/price",
             params={"symbol": symbol_pair},
             timeout=10,
@@ -60,7 +116,7 @@ def _send_telegram_message(chat_id: str, html: str, reply_markup: Dict[str, Any]
     if not BOT_TOKEN:
         return False
     try:
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+        url = _URL_SEND_MESSAGE
         payload = {
             "chat_id": chat_id,
             "text": html,
@@ -69,7 +125,7 @@ def _send_telegram_message(chat_id: str, html: str, reply_markup: Dict[str, Any]
         }
         if reply_markup:
             payload["reply_markup"] = reply_markup
-        r = requests.post(url, json=payload, timeout=15)
+        r = SESSION.post(url, json=payload, timeout=15)
         ok = r.status_code == 200 and r.json().get("ok") is True
         if not ok:
             print({"msg": "send_alert_message_fail", "chat_id": chat_id, "status": r.status_code, "body": r.text[:200]})
@@ -94,10 +150,12 @@ def _ack_inline_buttons(alert_id: int):
 # ────────────────────────────────────────────────────────────────────
 # Main alert runner
 
-def run_alert_cycle(session) -> Dict[str, int]:
+def run_alert_cycle(session, prices: Dict[str, float] | None = None) -> Dict[str, int]:
     """
     Evaluate user alerts and send notifications.
     Must be called with an active SQLAlchemy session bound to the same engine as db.session_scope.
+    `prices` is an optional {pair: price} snapshot; when omitted, the
+    all-symbols ticker is fetched once, on the first alert that needs a price.
     Returns counters for logging.
     """
     evaluated = 0
@@ -133,6 +191,12 @@ def run_alert_cycle(session) -> Dict[str, int]:
         """
     )).all()
 
+    # One Binance call per cycle: the all-symbols snapshot. Pairs it lacks
+    # fall back to the per-symbol endpoint, memoized for the rest of the cycle.
+    snapshot = prices
+    fallback: Dict[str, float | None] = {}
+    now = datetime.utcnow()
+
     for r in rows:
         evaluated += 1
         try:
@@ -141,22 +205,28 @@ def run_alert_cycle(session) -> Dict[str, int]:
             if not pair:
                 continue
 
-            price = fetch_price_binance(pair)
-            if price is None:
-                continue
-
-            rule = r.rule or ""
-            threshold = float(r.value)
-
-            # cooldown
+            # cooldown (checked before any network call)
             cooldown = int(r.cooldown_seconds or 0) or DEFAULT_COOLDOWN
             last_ts = r.last_fired_at
             if last_ts is not None:
-                diff = datetime.utcnow() - last_ts
+                diff = now - last_ts
                 if diff.total_seconds() < cooldown:
                     # still cooling
                     continue
 
+            if snapshot is None:
+                snapshot = fetch_all_prices_binance()
+            price = snapshot.get(pair)
+            if price is None:
+                if pair not in fallback:
+                    fallback[pair] = fetch_price_binance(pair)
+                price = fallback[pair]
+            if price is None:
+                continue
+
+            rule = r.rule or ""
+            threshold = float(r.value)
+
             # evaluate
             ok = False
             if rule == "price_above":